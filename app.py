@@ -7,11 +7,13 @@ import os
 import sys
 from typing import List, Optional, Dict, Any
 from datetime import datetime
+from contextlib import asynccontextmanager
 from pydantic import BaseModel
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query
+from fastapi.responses import ORJSONResponse, StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 from backend.db_models import (
-    get_session, Patient, Condition, Medication, Observation,
+    get_session, dispose_engine, Patient, Condition, Medication, Observation,
     Allergy, Immunization, PatientEligibility, ClinicalTrial, EligibilityCriteria
 )
 from backend.routers import (
@@ -20,10 +22,20 @@ from backend.routers import (
 )
 from backend.utils.auditor import Auditor
 
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Start model pre-warm and event subscriptions; release pooled DB connections on shutdown."""
+    await startup_event()
+    yield
+    dispose_engine()
+
 app = FastAPI(
+    lifespan=lifespan,
     title="Drug Trial Automation API",
     description="End-to-end automated drug trial system",
-    version="1.0.0"
+    version="1.0.0",
+    # orjson serializes the large list payloads several times faster than stdlib json
+    default_response_class=ORJSONResponse,
 )
 
 # CORS
@@ -44,9 +56,10 @@ app.add_middleware(
 _models_ready = False
 
 
-@app.on_event("startup")
 async def startup_event():
-    """Pre-load ALL heavy models on startup to avoid first-request delay."""
+    """Pre-load ALL heavy models on startup to avoid first-request delay.
+    Loading runs on a background thread so the server accepts health probes meanwhile;
+    requests that need a model before it's ready wait on get_nlp's load lock."""
     import threading
 
     def pre_warm():
@@ -67,6 +80,7 @@ async def startup_event():
             # 2. Warm up LLM connection (first call is slow)
             print("  ⏳ Warming up Ollama LLM...")
             llm = get_llm()
+            get_llm(json_mode=True)  # extraction agents use the JSON-mode instance
             try:
                 llm.invoke("Hello")
             except Exception as e:
@@ -84,6 +98,11 @@ async def startup_event():
             get_nlp_agent()
             print("  ✅ ProtocolRuleAgent ready")
 
+            print("  ⏳ Pre-initializing TrialChatAgent...")
+            from backend.routers.chat_router import get_chat_agent
+            get_chat_agent()
+            print("  ✅ TrialChatAgent ready")
+
             _models_ready = True
             print("✅ [STARTUP] ALL models pre-warmed and ready!")
 
@@ -138,6 +157,8 @@ class TrialCreate(BaseModel):
 
 
 # Routes
+# Handlers that use the (synchronous) SQLAlchemy session are plain `def`, so FastAPI
+# runs them in its threadpool instead of blocking the event loop for every query.
 @app.get("/")
 async def root():
     return {
@@ -174,105 +195,190 @@ async def model_readiness():
         "llm_connected": _shared_llm is not None
     }
 
+def _project(columns: Dict[str, Any], fields: Optional[str]) -> List[Any]:
+    """Labeled columns for a comma-separated `fields` projection (all when omitted); id is always kept."""
+    if not fields:
+        return [col.label(name) for name, col in columns.items()]
+    wanted = {f.strip() for f in fields.split(",") if f.strip()} | {"id"}
+    unknown = wanted - columns.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    return [col.label(name) for name, col in columns.items() if name in wanted]
+
+def _page_response(key: str, rows, limit: Optional[int]) -> ORJSONResponse:
+    """List payload. Paged (limit set) responses also carry next_cursor: the last id
+    as a string, or None once the final page has been returned."""
+    result = [dict(r) for r in rows]
+    payload = {key: result, "count": len(result)}
+    if limit is not None:
+        payload["next_cursor"] = str(result[-1]["id"]) if result and len(result) == limit else None
+    return ORJSONResponse(payload)
+
+# Rows fetched per server-side cursor round trip when streaming NDJSON
+STREAM_CHUNK_ROWS = 1000
+
+def _stream_ndjson(session, stmt) -> StreamingResponse:
+    """Stream stmt's rows as NDJSON through a server-side cursor, so memory stays
+    O(chunk) however many rows match. Takes ownership of (and closes) the session."""
+    import orjson
+
+    def rows():
+        try:
+            result = session.execute(stmt, execution_options={"stream_results": True,
+                                                              "yield_per": STREAM_CHUNK_ROWS})
+            for chunk in result.mappings().partitions():
+                yield b"".join(orjson.dumps(dict(r)) + b"\n" for r in chunk)
+        finally:
+            session.close()
+
+    return StreamingResponse(rows(), media_type="application/x-ndjson")
+
+def _patient_list_columns():
+    from sqlalchemy import case, func
+    return {
+        "id": Patient.id,
+        "birthdate": Patient.birthdate,
+        "gender": Patient.gender,
+        "age_group": Patient.age_group,
+        "city": case((Patient.is_deidentified.is_(True), "REDACTED"), else_=Patient.city),
+        "state": Patient.state,
+        "is_deidentified": func.coalesce(Patient.is_deidentified, False),
+    }
+
 @app.get("/api/patients")
-async def get_patients(limit: int = 100):
-    """Get all patients (de-identified -- no PII returned)"""
+def get_patients(limit: Optional[int] = Query(100, ge=1), after_id: Optional[str] = None, fields: Optional[str] = None,
+                 gender: Optional[str] = None, state: Optional[str] = None, stream: bool = False):
+    """Get patients (de-identified -- no PII returned), keyset-paginated by id.
+    Pass the returned next_cursor as after_id for the next page.
+    stream=true returns every matching row as NDJSON instead (limit ignored)."""
+    from sqlalchemy import select
+
+    if stream:
+        limit = None
     session = get_session()
     try:
-        patients = session.query(Patient).limit(limit).all()
-        result = [
-            {
-                "id": p.id,
-                "birthdate": str(p.birthdate),
-                "gender": p.gender,
-                "age_group": p.age_group,
-                "city": "REDACTED" if p.is_deidentified else p.city,
-                "state": p.state,
-                "is_deidentified": p.is_deidentified or False,
-            }
-            for p in patients
-        ]
-        return {"patients": result, "count": len(result)}
+        # Select just the response columns (redaction done in SQL) and hand plain
+        # dicts to orjson directly, skipping ORM object loading and jsonable_encoder
+        stmt = select(*_project(_patient_list_columns(), fields)).order_by(Patient.id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        if after_id is not None:
+            stmt = stmt.where(Patient.id > after_id)
+        if gender:
+            stmt = stmt.where(Patient.gender == gender)
+        if state:
+            stmt = stmt.where(Patient.state == state)
+        if stream:
+            response, session = _stream_ndjson(session, stmt), None
+            return response
+        return _page_response("patients", session.execute(stmt).mappings().all(), limit)
     finally:
-        session.close()
+        if session is not None:
+            session.close()
+
+# Response fields of each clinical record list in /api/patients/{id}: key -> column
+_PATIENT_DETAIL_FIELDS = {
+    "conditions": (Condition, {"code": Condition.code, "description": Condition.description,
+                               "start_date": Condition.start_date}),
+    "medications": (Medication, {"code": Medication.code, "description": Medication.description,
+                                 "start_date": Medication.start_date}),
+    "observations": (Observation, {"code": Observation.code, "description": Observation.description,
+                                   "value": Observation.value, "units": Observation.units,
+                                   "date": Observation.observation_date}),
+    "allergies": (Allergy, {"code": Allergy.code, "description": Allergy.description,
+                            "type": Allergy.allergy_type, "category": Allergy.category,
+                            "reaction": Allergy.reaction1, "severity": Allergy.severity1}),
+    "immunizations": (Immunization, {"code": Immunization.code, "description": Immunization.description,
+                                     "date": Immunization.immunization_date}),
+}
+
+# Patient columns surfaced by /api/patients/{id}; the rest of the row is never loaded
+_PATIENT_SUMMARY_COLUMNS = (Patient.id, Patient.birthdate, Patient.gender, Patient.race,
+                            Patient.age_group, Patient.city, Patient.state, Patient.is_deidentified)
+
+def _json_list_of(model, fields, label):
+    """Correlated subquery aggregating a patient's rows of model into a JSON array."""
+    from sqlalchemy import select, func, literal, literal_column
+    pairs = [arg for key, col in fields.items() for arg in (literal(key), col)]
+    return select(
+        func.coalesce(func.json_agg(func.json_build_object(*pairs)), literal_column("'[]'::json"))
+    ).where(model.patient_id == Patient.id).scalar_subquery().label(label)
 
 @app.get("/api/patients/{patient_id}")
-async def get_patient_details(patient_id: str):
+def get_patient_details(patient_id: str):
     """Get detailed patient information"""
     session = get_session()
     try:
-        patient = session.query(Patient).filter_by(id=patient_id).first()
-        if not patient:
+        # Patient plus every clinical list in one round trip (JSON-aggregating subqueries)
+        row = session.query(
+            *_PATIENT_SUMMARY_COLUMNS,
+            *(_json_list_of(model, fields, key) for key, (model, fields) in _PATIENT_DETAIL_FIELDS.items())
+        ).filter(Patient.id == patient_id).first()
+        if not row:
             raise HTTPException(status_code=404, detail="Patient not found")
 
-        conditions = session.query(Condition).filter_by(patient_id=patient_id).all()
-        medications = session.query(Medication).filter_by(patient_id=patient_id).all()
-        observations = session.query(Observation).filter_by(patient_id=patient_id).all()
-        allergies = session.query(Allergy).filter_by(patient_id=patient_id).all()
-        immunizations = session.query(Immunization).filter_by(patient_id=patient_id).all()
-
         return {
             "patient": {
-                "id": patient.id,
-                "birthdate": str(patient.birthdate),
-                "gender": patient.gender,
-                "race": patient.race,
-                "age_group": patient.age_group,
-                "city": "REDACTED" if patient.is_deidentified else patient.city,
-                "state": patient.state,
-                "is_deidentified": patient.is_deidentified or False,
+                "id": row.id,
+                "birthdate": row.birthdate,
+                "gender": row.gender,
+                "race": row.race,
+                "age_group": row.age_group,
+                "city": "REDACTED" if row.is_deidentified else row.city,
+                "state": row.state,
+                "is_deidentified": row.is_deidentified or False,
             },
-            "conditions": [
-                {"code": c.code, "description": c.description, "start_date": str(c.start_date)}
-                for c in conditions
-            ],
-            "medications": [
-                {"code": m.code, "description": m.description, "start_date": str(m.start_date)}
-                for m in medications
-            ],
-            "observations": [
-                {"code": o.code, "description": o.description, "value": o.value,
-                 "units": o.units, "date": str(o.observation_date)}
-                for o in observations
-            ],
-            "allergies": [
-                {"code": a.code, "description": a.description, "type": a.allergy_type,
-                 "category": a.category, "reaction": a.reaction1, "severity": a.severity1}
-                for a in allergies
-            ],
-            "immunizations": [
-                {"code": i.code, "description": i.description, "date": str(i.immunization_date)}
-                for i in immunizations
-            ]
+            **{key: getattr(row, key) for key in _PATIENT_DETAIL_FIELDS},
         }
     finally:
         session.close()
 
+def _trial_list_columns():
+    from sqlalchemy import func
+    return {
+        "id": ClinicalTrial.id,
+        "trial_id": ClinicalTrial.trial_id,
+        "protocol_title": ClinicalTrial.protocol_title,
+        "phase": ClinicalTrial.phase,
+        "indication": ClinicalTrial.indication,
+        "drug_name": ClinicalTrial.drug_name,
+        "status": ClinicalTrial.status,
+        "analysis_status": func.coalesce(ClinicalTrial.analysis_status, "pending"),
+    }
+
 @app.get("/api/trials")
-async def get_trials():
-    """Get all clinical trials"""
+def get_trials(limit: Optional[int] = Query(None, ge=1), after_id: Optional[str] = None, fields: Optional[str] = None,
+               status: Optional[str] = None, phase: Optional[str] = None, stream: bool = False):
+    """Get clinical trials ordered by id. Without `limit` all trials are returned;
+    with it, pass the returned next_cursor as after_id for the next page.
+    stream=true returns the rows as NDJSON through a server-side cursor."""
+    from sqlalchemy import select
+
+    if after_id is not None and not after_id.isdigit():
+        raise HTTPException(status_code=400, detail="after_id must be a next_cursor from /api/trials")
+    if stream:
+        limit = None
     session = get_session()
     try:
-        trials_list = session.query(ClinicalTrial).all()
-        result = [
-            {
-                "id": t.id,
-                "trial_id": t.trial_id,
-                "protocol_title": t.protocol_title,
-                "phase": t.phase,
-                "indication": t.indication,
-                "drug_name": t.drug_name,
-                "status": t.status,
-                "analysis_status": t.analysis_status or "pending"
-            }
-            for t in trials_list
-        ]
-        return {"trials": result, "count": len(result)}
+        stmt = select(*_project(_trial_list_columns(), fields)).order_by(ClinicalTrial.id)
+        if limit is not None:
+            stmt = stmt.limit(limit)
+        if after_id is not None:
+            stmt = stmt.where(ClinicalTrial.id > int(after_id))
+        if status:
+            stmt = stmt.where(ClinicalTrial.status == status)
+        if phase:
+            stmt = stmt.where(ClinicalTrial.phase == phase)
+        if stream:
+            response, session = _stream_ndjson(session, stmt), None
+            return response
+        return _page_response("trials", session.execute(stmt).mappings().all(), limit)
     finally:
-        session.close()
+        if session is not None:
+            session.close()
 
 @app.post("/api/trials")
-async def create_trial(trial: TrialCreate):
+def create_trial(trial: TrialCreate):
     """Create a new clinical trial"""
     session = get_session()
 
@@ -317,7 +423,7 @@ async def create_trial(trial: TrialCreate):
     return result
 
 @app.post("/api/eligibility/batch-check")
-async def batch_check_eligibility(request: BatchEligibilityRequest):
+def batch_check_eligibility(request: BatchEligibilityRequest):
     """Check eligibility for multiple patients (Optimized)"""
     from backend.agents.eligibility_matcher import EligibilityMatcher
 
@@ -378,7 +484,7 @@ async def batch_check_eligibility(request: BatchEligibilityRequest):
         session.close()
 
 @app.post("/api/eligibility/check")
-async def check_eligibility(request: EligibilityRequest):
+def check_eligibility(request: EligibilityRequest):
     """Check patient eligibility for a trial"""
     from backend.agents.eligibility_matcher import EligibilityMatcher
 
@@ -435,7 +541,7 @@ async def check_eligibility(request: EligibilityRequest):
         session.close()
 
 @app.get("/api/eligibility/results/{trial_id}")
-async def get_eligibility_results(trial_id: int):
+def get_eligibility_results(trial_id: int):
     """Get all eligibility results for a specific trial"""
     from backend.db_models import EligibilityAudit
     
@@ -467,7 +573,7 @@ async def get_eligibility_results(trial_id: int):
         session.close()
 
 @app.post("/api/fda/extract")
-async def extract_fda_forms(pdf_filename: str = "2.pdf"):
+def extract_fda_forms(pdf_filename: str = "2.pdf"):
     """Extract FDA form data from drug documentation PDF"""
     pdf_path = f"data/drug/{pdf_filename}"
 
@@ -523,30 +629,36 @@ async def extract_fda_forms(pdf_filename: str = "2.pdf"):
     }
 
 @app.post("/api/data/import")
-async def import_data():
-    """Import patient data from CSV files"""
-    from import_data import import_all_data
+def import_data():
+    """Import patient data from CSV files (de-identified patients, COPY-loaded clinical tables)"""
+    from load_patients import load_all
 
     try:
-        import_all_data()
+        load_all()
         return {"message": "Data import completed successfully"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 @app.get("/api/stats")
-async def get_stats():
+def get_stats():
     """Get system statistics"""
-    session = get_session()
+    from sqlalchemy import select, func
 
-    stats = {
-        "total_patients": session.query(Patient).count(),
-        "total_conditions": session.query(Condition).count(),
-        "total_trials": session.query(ClinicalTrial).count(),
-        "total_eligibility_checks": session.query(PatientEligibility).count()
-    }
+    def count_of(model, label):
+        return select(func.count()).select_from(model).scalar_subquery().label(label)
 
-    session.close()
-    return stats
+    session = get_session()
+    try:
+        # All counts in one round trip (one SELECT of scalar subqueries)
+        counts = session.execute(select(
+            count_of(Patient, "total_patients"),
+            count_of(Condition, "total_conditions"),
+            count_of(ClinicalTrial, "total_trials"),
+            count_of(PatientEligibility, "total_eligibility_checks"),
+        )).mappings().one()
+        return {**counts}
+    finally:
+        session.close()
 
 if __name__ == "__main__":
     import uvicorn
@@ -12,6 +12,8 @@ class TrialChatAgent:
     """
     Interactive Agent for querying clinical trial data and analysis results.
     """
+    ERROR_RESPONSE = "I encountered an error processing your request."
+
     def __init__(self):
         self.llm = get_llm()
         self.cache_dir = Path("/app/data/insilico_cache")
@@ -46,7 +48,7 @@ class TrialChatAgent:
             return self.llm.invoke(prompt)
         except Exception as e:
             logger.error(f"Chat failed: {e}")
-            return "I encountered an error processing your request."
+            return self.ERROR_RESPONSE
 
     def _build_trial_context(self, trial_id: str) -> str:
         """Fetch and summarize data for a specific trial."""
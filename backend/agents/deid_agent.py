@@ -14,8 +14,9 @@ class DeIDAgent:
         self.nlp = None
         if load_nlp:
             try:
-                import spacy
-                self.nlp = spacy.load(model_name)
+                # Shared pipeline: a private spacy.load would keep a second copy in memory
+                from backend.nlp_utils import get_nlp
+                self.nlp = get_nlp(model_name)
             except Exception:
                 self.nlp = None
             
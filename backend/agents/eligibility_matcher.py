@@ -23,6 +23,11 @@ from datetime import datetime, date
 from typing import Dict, List, Optional, Tuple
 import re
 
+import numpy as np
+
+
+# Rows fetched per round trip when streaming clinical records with yield_per
+STREAM_BATCH_SIZE = 200
 
 # Phrases in exclusion criteria that are too vague for keyword matching
 VAGUE_EXCLUSION_PHRASES = [
@@ -82,6 +87,63 @@ class EligibilityMatcher:
         t = text.lower()
         return any(phrase in t for phrase in VAGUE_EXCLUSION_PHRASES)
 
+    @staticmethod
+    def _age_bounds(criterion) -> Tuple[Optional[float], Optional[float]]:
+        """Inclusive (min_age, max_age) for an AGE criterion; raises if the value is unparseable."""
+        if getattr(criterion, 'operator', None) == 'BETWEEN' and criterion.value:
+            if '-' in criterion.value:
+                parts = criterion.value.split('-')
+                v1, v2 = float(parts[0]), float(parts[1]) if len(parts) > 1 else 999
+            else:
+                v1 = float(criterion.value)
+                v2 = float(criterion.unit) if (criterion.unit and criterion.unit.replace('.', '').isdigit()) else 999
+            return int(v1), int(v2)
+        threshold = int(float(criterion.value))
+        op = criterion.operator or '>'
+        if op == '>=':
+            return threshold, None
+        if op == '<=':
+            return None, threshold
+        if op == '>':
+            return threshold + 1, None
+        if op == '<':
+            return None, threshold - 1
+        return np.inf, None  # unknown operator never matches
+
+    def _evaluate_age_columnar(self, patients: List[Patient], criteria: List) -> Dict[Tuple[str, int], Dict]:
+        """
+        Evaluate every ungrouped AGE criterion against every patient in one shot.
+        Criteria become columns (min/max bound arrays), patients rows (age array),
+        so the per-patient loop only does a dict lookup.
+        """
+        age_criteria, mins, maxs = [], [], []
+        for c in criteria:
+            if c.group_id or (c.category or '').upper() != 'AGE':
+                continue
+            try:
+                lo, hi = self._age_bounds(c)
+            except Exception:
+                continue  # left to _evaluate_criterion, which reports missing_data
+            age_criteria.append(c)
+            mins.append(-np.inf if lo is None else lo)
+            maxs.append(np.inf if hi is None else hi)
+        if not age_criteria or not patients:
+            return {}
+
+        today = date.today()
+        ages = np.array([
+            np.nan if p.birthdate is None else self.calculate_age(p.birthdate, today)
+            for p in patients
+        ], dtype=float)[:, None]
+        # NaN ages compare False, matching check_age_criteria for missing birthdates
+        met = (ages >= np.array(mins)[None, :]) & (ages <= np.array(maxs)[None, :])
+
+        return {
+            (p.id, c.id): {'criterion_id': c.id, 'status': 'met' if met[i, j] else 'not_met', 'confidence': 1.0}
+            for i, p in enumerate(patients)
+            for j, c in enumerate(age_criteria)
+        }
+
     # ── Data Retrieval ───────────────────────────────────────────────────
 
     def get_patient_data(self, patient_id: str) -> Optional[Dict]:
@@ -285,11 +347,6 @@ class EligibilityMatcher:
             return {pid: err for pid in patient_ids}
 
         patients = self.session.query(Patient).filter(Patient.id.in_(patient_ids)).all()
-        all_conditions = self.session.query(Condition).filter(Condition.patient_id.in_(patient_ids)).all()
-        all_meds = self.session.query(Medication).filter(Medication.patient_id.in_(patient_ids)).all()
-        all_obs = self.session.query(Observation).filter(Observation.patient_id.in_(patient_ids)).all()
-        all_allergies = self.session.query(Allergy).filter(Allergy.patient_id.in_(patient_ids)).all()
-        all_imms = self.session.query(Immunization).filter(Immunization.patient_id.in_(patient_ids)).all()
 
         trial = self.session.query(ClinicalTrial).filter(ClinicalTrial.id == trial_id).first()
         current_weights = self.weights.copy()
@@ -301,19 +358,20 @@ class EligibilityMatcher:
                     'observations': [], 'allergies': [], 'immunizations': []}
             for p in patients
         }
-        for c in all_conditions:
-            if c.patient_id in patient_map: patient_map[c.patient_id]['conditions'].append(c)
-        for m in all_meds:
-            if m.patient_id in patient_map: patient_map[m.patient_id]['medications'].append(m)
-        for o in all_obs:
-            if o.patient_id in patient_map: patient_map[o.patient_id]['observations'].append(o)
-        for a in all_allergies:
-            if a.patient_id in patient_map: patient_map[a.patient_id]['allergies'].append(a)
-        for i in all_imms:
-            if i.patient_id in patient_map: patient_map[i.patient_id]['immunizations'].append(i)
+        # Clinical records are only walked once to bucket them per patient, so stream
+        # them through a server-side cursor instead of materializing each full table slice
+        for model, key in ((Condition, 'conditions'), (Medication, 'medications'),
+                           (Observation, 'observations'), (Allergy, 'allergies'),
+                           (Immunization, 'immunizations')):
+            rows = (self.session.query(model)
+                    .filter(model.patient_id.in_(patient_ids))
+                    .yield_per(STREAM_BATCH_SIZE))
+            for row in rows:
+                if row.patient_id in patient_map: patient_map[row.patient_id][key].append(row)
 
         results = {}
         criterion_lookup = {c.id: c for c in criteria}
+        age_results = self._evaluate_age_columnar(patients, criteria)
 
         for pid in patient_ids:
             if pid not in patient_map:
@@ -344,7 +402,7 @@ class EligibilityMatcher:
                 elif criterion.group_id:
                     continue
                 else:
-                    result = self._evaluate_criterion(p_data, criterion)
+                    result = age_results.get((pid, criterion.id)) or self._evaluate_criterion(p_data, criterion)
                     result['text'] = criterion.text
 
                 cat = (criterion.category or '').upper()
@@ -470,27 +528,8 @@ class EligibilityMatcher:
         # ── AGE ──────────────────────────────────────────────────────
         if cat == 'AGE':
             try:
-                if getattr(criterion, 'operator', None) == 'BETWEEN' and criterion.value:
-                    if '-' in criterion.value:
-                        parts = criterion.value.split('-')
-                        v1, v2 = float(parts[0]), float(parts[1]) if len(parts) > 1 else 999
-                    else:
-                        v1 = float(criterion.value)
-                        v2 = float(criterion.unit) if (criterion.unit and criterion.unit.replace('.', '').isdigit()) else 999
-                    met = self.check_age_criteria(patient, min_age=int(v1), max_age=int(v2))
-                else:
-                    threshold = int(float(criterion.value))
-                    op = criterion.operator or '>'
-                    if op == '>=':
-                        met = self.check_age_criteria(patient, min_age=threshold)
-                    elif op == '<=':
-                        met = self.check_age_criteria(patient, max_age=threshold)
-                    elif op == '>':
-                        met = self.check_age_criteria(patient, min_age=threshold + 1)
-                    elif op == '<':
-                        met = self.check_age_criteria(patient, max_age=threshold - 1)
-                    else:
-                        met = False
+                min_age, max_age = self._age_bounds(criterion)
+                met = self.check_age_criteria(patient, min_age=min_age, max_age=max_age)
                 return {'criterion_id': cid, 'status': 'met' if met else 'not_met', 'confidence': 1.0}
             except Exception:
                 return {'criterion_id': cid, 'status': 'missing_data', 'confidence': 0.0}
@@ -9,7 +9,7 @@ import re
 import hashlib
 from typing import Dict, Optional, List, Any
 from datetime import datetime
-import json
+import orjson
 
 # PDF Processing
 import fitz  # PyMuPDF
@@ -18,6 +18,11 @@ import pdfplumber
 # NLP
 import spacy
 
+# LLM JSON cleanup, done on bytes so orjson parses the result without another decode:
+# control characters (except \t \n \r) are dropped with bytes.translate, // comments by regex
+_CTRL_BYTES = bytes(c for c in range(32) if c not in (9, 10, 13))
+_COMMENT_RE = re.compile(rb'//.*')
+
 
 class FDAProcessor:
     """
@@ -59,12 +64,12 @@ class FDAProcessor:
                         break
             
             if end != -1:
-                json_str = clean_response[start:end+1]
+                json_bytes = clean_response[start:end+1].encode('utf-8', 'replace')
                 # Remove control characters except newlines/tabs
-                json_str = "".join(ch for ch in json_str if ord(ch) >= 32 or ch in ['\n', '\r', '\t'])
+                json_bytes = json_bytes.translate(None, _CTRL_BYTES)
                 # Strip // style comments
-                json_str = re.sub(r'//.*', '', json_str)
-                return json.loads(json_str)
+                json_bytes = _COMMENT_RE.sub(b'', json_bytes)
+                return orjson.loads(json_bytes)
         except Exception as e:
             print(f"⚠️  JSON parse failed: {e}. Response was: {response[:100]}...")
         return None
@@ -414,9 +419,11 @@ class FDAProcessor:
     def _compute_hash(self, pdf_path: str) -> str:
         """Compute SHA256 hash of PDF file"""
         sha256_hash = hashlib.sha256()
-        with open(pdf_path, "rb") as f:
-            for byte_block in iter(lambda: f.read(4096), b""):
-                sha256_hash.update(byte_block)
+        buf = bytearray(1 << 20)
+        view = memoryview(buf)
+        with open(pdf_path, "rb", buffering=0) as f:
+            while n := f.readinto(buf):
+                sha256_hash.update(view[:n])
         return sha256_hash.hexdigest()
     
     def _extract_1571(self, text: str, structured_data: Dict, use_llm: bool = True) -> Dict:
@@ -790,7 +797,7 @@ TEXT (first pages):
 {context_text}
 
 PRELIMINARY HINTS (from pattern matching - verify against text):
-{json.dumps(compact_hints)}
+{orjson.dumps(compact_hints, default=str).decode()}
 
 Extract ALL of these fields. Return null if not found in the text.
 
@@ -30,8 +30,8 @@ class MolecularTargetAgent:
         linker = self.nlp.get_pipe("scispacy_linker")
         
         print(f"🔬 Analyzing biological targets across {len(text_chunks)} chunks...")
-        for chunk in text_chunks:
-            doc = self.nlp(chunk)
+        # One nlp.pipe stream over all chunks rather than a pipeline call per chunk
+        for doc in self.nlp.pipe(text_chunks, batch_size=8):
             
             for ent in doc.ents:
                 concept = None
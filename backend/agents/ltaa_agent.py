@@ -11,7 +11,7 @@ from collections import Counter
 from json import JSONDecoder, JSONDecodeError
 from backend.utils.pubmed_connector import fetch_pubmed_abstracts
 from backend.utils.pdf_ingest import process_pdf_document
-from backend.utils.bio_nlp import extract_bio_entities
+from backend.utils.bio_nlp import extract_bio_entities, extract_bio_entities_batch
 from backend.utils.graph_builder import GraphBuilder
 from backend.utils.bio_filters import is_generic_term, GENERIC_TERMS
 from backend.utils.bio_validator import get_validator
@@ -285,6 +285,11 @@ class LTAAAgent:
             logger.info(f"⚠️ Capping {len(processing_tasks)} chunks to {MAX_CHUNKS} to prevent OOM")
             processing_tasks = processing_tasks[:MAX_CHUNKS]
 
+        # NER for all chunks in one nlp.pipe stream; the per-chunk filtering and graph
+        # writes below still run in parallel
+        for task, entities in zip(processing_tasks, extract_bio_entities_batch([t["text"] for t in processing_tasks])):
+            task["entities"] = entities
+
         print(f"🚀 Processing {len(processing_tasks)} chunks in parallel...")
         with ThreadPoolExecutor(max_workers=4) as executor:
             list(executor.map(lambda t: self._process_text(**t), processing_tasks))
@@ -336,11 +341,14 @@ class LTAAAgent:
         return result
 
     def _process_text(self, disease_query: str, text: str, source: str, page: int, 
-                     domain: Domain = Domain.GENERAL, doc_type: DocumentType = DocumentType.UNKNOWN):
+                     domain: Domain = Domain.GENERAL, doc_type: DocumentType = DocumentType.UNKNOWN,
+                     entities: List[Dict[str, Any]] = None):
         """
         Process text chunk with domain-aware validation and comprehensive filtering.
+        `entities` may be precomputed (batched NER); otherwise they're extracted here.
         """
-        entities = extract_bio_entities(text)
+        if entities is None:
+            entities = extract_bio_entities(text)
         seen_entities = set()  # Per-chunk deduplication
         
         # Get domain-specific generic terms
@@ -1,5 +1,6 @@
 import logging
 import asyncio
+import functools
 import traceback
 from typing import Dict, List, Any, Optional
 
@@ -118,7 +119,7 @@ class TrialOrchestrator:
         logger.info(f"Orchestrator delegating LTAA for trial {trial_id}, disease: {disease}")
 
         from backend.routers.trials import run_ltaa_analysis
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         await loop.run_in_executor(None, lambda: run_ltaa_analysis(disease, trial_id))
 
     async def _run_insilico(self, trial_id: str, context: Dict[str, Any]):
@@ -133,7 +134,7 @@ class TrialOrchestrator:
         logger.info(f"Orchestrator delegating In Silico for trial {trial_id}")
 
         from backend.routers.trials import run_insilico_analysis
-        loop = asyncio.get_event_loop()
+        loop = asyncio.get_running_loop()
         await loop.run_in_executor(None, lambda: run_insilico_analysis(trial_id, text))
 
     def _update_status(self, trial_id: str, status: str):
@@ -173,6 +174,11 @@ class TrialOrchestrator:
         except Exception as e:
             logger.error(f"Audit log failed: {e}")
 
+    async def _offload(self, fn, *args, **kwargs):
+        """Run a blocking DB write on the default executor so it doesn't stall the event loop."""
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(None, functools.partial(fn, *args, **kwargs))
+
     async def handle_new_trial(self, trial_data: Dict[str, Any]):
         """
         Event handler for TRIAL_CREATED.
@@ -181,26 +187,26 @@ class TrialOrchestrator:
         trial_id = trial_data.get('trial_id')
         logger.info(f"Orchestrator received new trial: {trial_id}")
 
-        self._update_status(trial_id, "running")
+        await self._offload(self._update_status, trial_id, "running")
         plan = []
         try:
             plan = self.plan_analysis(trial_data)
-            self._audit_log("Orchestration Started", trial_id, details={"plan": plan})
+            await self._offload(self._audit_log, "Orchestration Started", trial_id, details={"plan": plan})
 
             results = await self.execute_plan(trial_id, plan, trial_data)
 
             any_failed = any("failed" in str(v) for v in results.values())
             if any_failed:
-                self._update_status(trial_id, "failed")
-                self._audit_log("Orchestration Completed", trial_id, status="Partial Failure", details=results)
+                await self._offload(self._update_status, trial_id, "failed")
+                await self._offload(self._audit_log, "Orchestration Completed", trial_id, status="Partial Failure", details=results)
                 logger.warning(f"Orchestrator completed with failures for {trial_id}: {results}")
             else:
-                self._update_status(trial_id, "completed")
-                self._audit_log("Orchestration Completed", trial_id, details=results)
+                await self._offload(self._update_status, trial_id, "completed")
+                await self._offload(self._audit_log, "Orchestration Completed", trial_id, details=results)
                 logger.info(f"Orchestrator completed successfully for {trial_id}: {results}")
 
         except Exception as e:
             logger.error(f"Orchestrator failed for {trial_id}: {e}")
             logger.error(traceback.format_exc())
-            self._update_status(trial_id, "failed")
-            self._audit_log("Orchestration Failed", trial_id, status="Failed", details={"error": str(e), "plan": plan})
+            await self._offload(self._update_status, trial_id, "failed")
+            await self._offload(self._audit_log, "Orchestration Failed", trial_id, status="Failed", details={"error": str(e), "plan": plan})
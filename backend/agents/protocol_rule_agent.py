@@ -5,11 +5,20 @@ Uses LLM + scispaCy for dynamic medical term detection without hardcoded pattern
 CRITICAL: NO HALLUCINATION - All extracted data must exist in the source document.
 """
 
+import os
 import re
-import json
+import copy
+import asyncio
+import gzip
+import hashlib
+import functools
+import threading
+import warnings
+from concurrent.futures import Future, ProcessPoolExecutor, ThreadPoolExecutor
 from typing import List, Dict, Optional, Any
 import spacy
 import io
+import orjson
 
 # PDF Processing libraries
 import pdfplumber
@@ -24,6 +33,13 @@ except ImportError:
     SCISPACY_AVAILABLE = False
     print("⚠️  scispacy not installed. Run: pip install scispacy==0.5.4")
 
+# Aho-Corasick keyword matching (optional, falls back to a compiled regex)
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
 # OCR support (optional)
 try:
     from PIL import Image
@@ -34,47 +50,541 @@ except Exception:
 
 from negspacy.negation import Negex
 
+from backend.utils.llm_cache import LLMCache
+from backend.nlp_utils import pipe_cached
+
+# Numeric tokens (integers and decimals) used for source-text validation
+_NUMBER_RE = re.compile(r'\d+\.?\d*')
+# LLM placeholders that aren't real values and skip source validation
+_NON_VALUE_LITERALS = frozenset(("null", "true", "false", "True", "False"))
+_DIGIT_RE = re.compile(r'\d')
+# Eligibility section headers (START markers). Numbered headings may have any depth
+# ("4.2", "8.3.2."); the broader variants keep non-standard protocols off the LLM fallback.
+_SECTION_NUMBER = r'(?:\n\s*)(?:\d+(?:\.\d+)*\.?\s*)?'
+_SECTION_PATTERNS = {
+    'screening': re.compile(
+        _SECTION_NUMBER +
+        r'(?:Screening\s+Criteria|Eligibility\s+Criteria|Selection\s+Criteria'
+        r'|Selection\s+of\s+(?:Patients|Subjects|Participants|(?:the\s+)?Study\s+Population)'
+        r'|(?:Subject|Patient|Participant)\s+(?:Eligibility|Selection))',
+        re.IGNORECASE),
+    'inclusion': re.compile(
+        _SECTION_NUMBER +
+        r'(?:(?:Key|Main|Principal)\s+)?'
+        r'(?:Inclusion\s+Criteria|Criteria\s+for\s+(?:(?:Subject|Patient|Participant)\s+)?Inclusion'
+        r'|Inclusion\s+of\s+(?:Subjects|Patients|Participants))',
+        re.IGNORECASE),
+    'exclusion': re.compile(
+        _SECTION_NUMBER +
+        r'(?:(?:Key|Main|Principal)\s+)?'
+        r'(?:Exclusion\s+Criteria|Criteria\s+for\s+(?:(?:Subject|Patient|Participant)\s+)?Exclusion'
+        r'|Exclusion\s+of\s+(?:Subjects|Patients|Participants))',
+        re.IGNORECASE),
+}
+
+# Pipeline components _extract_basic_facts depends on (see ProtocolRuleAgent.__init__)
+_CRITERIA_PIPES = {"tok2vec", "ner", "negex", "scispacy_linker"}
+# Vocabulary every supported eligibility section header contains (see _detect_sections)
+_CRITERIA_MARKER_RE = re.compile(r'inclusion|exclusion|eligibility|criteria|selection', re.IGNORECASE)
+
+def _prompt_value(value) -> str:
+    """Render a fact for the prompt: scalars as-is, lists/dicts as compact JSON (not Python reprs)."""
+    if isinstance(value, (str, int, float, bool)):
+        return str(value)
+    return orjson.dumps(value, default=str).decode()
+
+# Static segments of the single-criterion normalization prompt (see _normalize_with_llm)
+_NORMALIZE_PROMPT_HEAD = """You are a clinical trial criteria normalizer. Your job is to format extracted data, NOT to infer or guess.
+
+SOURCE TEXT:
+\""""
+_NORMALIZE_PROMPT_FACTS = """"
+
+EXTRACTED FACTS:
+"""
+_NORMALIZE_PROMPT_RULES = """
+
+STRICT RULES:
+1. ONLY USE VALUES THAT APPEAR IN THE SOURCE TEXT
+2. If a value is not in the source text, use null
+3. Do not infer operators, units, or values not explicitly stated
+4. Field names should match medical terminology in the source
+5. This is for """
+_NORMALIZE_PROMPT_FIELDS = """ criteria
+6. RETURN ONLY GENUINE JSON. NO COMMENTS (//), NO MARKDOWN, NO EXPLANATIONS.
+
+Return a clean JSON object with these fields:
+- rule_type: """
+_NORMALIZE_PROMPT_CATEGORY = """
+- category: """
+_NORMALIZE_PROMPT_FIELD_SPEC = """
+- field: The specific medical parameter, drug, or clinical condition (e.g., 'ALT level', 'history of cardiomyopathy', 'Benznidazole'). AVOID generic terms like 'Women', 'History', or 'Signs'.
+- operator: The comparison operator (>=, <=, >, <, =, BETWEEN, PRESENT, ABSENT)
+- value: The numeric value or null
+- value2: Second value for ranges or null
+- unit: The unit of measurement or null
+- applies_to: ALL, MALE, or FEMALE
+- negated: true or false
+- source_text: \""""
+_NORMALIZE_PROMPT_TAIL = """"
+
+PHASE 2 ENHANCEMENTS (extract if present in source text):
+- temporal: {"window": <number>, "unit": "months"} for time constraints like "within 6 months" or "in the past year"
+- scope: "personal" (default) or "family" if explicitly mentions "family history"
+- value_list: ["item1", "item2", ...] for multi-value rules like "warfarin, apixaban, or rivaroxaban"
+- group: {"group_id": "auto", "logic": "AND/OR"} for compound rules with multiple connected parts (use null for single rules)
+
+JSON:"""
+
+# Canonical forms for comparison operators found in criteria text
+_OPERATOR_MAP = {
+    '>=': '>=', '≥': '>=', 'at least': '>=', 'greater than or equal': '>=', 'more than or equal': '>=',
+    '<=': '<=', '≤': '<=', 'at most': '<=', 'less than or equal': '<=',
+    '>': '>', 'greater than': '>', 'more than': '>', 'above': '>',
+    '<': '<', 'less than': '<', 'below': '<', 'under': '<',
+    '=': '='
+}
+
+# ---------------------------------------------------------------------------
+# Precompiled patterns. Everything below runs once per criterion (or per
+# protocol pass), so patterns are compiled once at import rather than looked
+# up in re's internal cache on every call.
+# ---------------------------------------------------------------------------
+
+# Numeric value / operator extraction (VALUE extraction, not TERM detection)
+_VALUE_UNITS = r'(years?|kg|mg/dL|g/dL|mL/min(?:/1\.73\s*m²?)?|×?\s*ULN|%|mmHg|msec|ms|days?|weeks?|months?|bpm|L/min|cm3|cm³)'
 
-def parse_pdf_file(path, ocr_threshold_chars=100):
+# Numeric value with operator, supporting ± ranges
+VALUE_PATTERN = re.compile(
+    r'(>=|<=|>|<|≥|≤|=|between|at least|at most|more than|less than|greater than|\u00B1|\+/-)\s*'
+    r'(\d+(?:\.\d+)?)\s*(?:\u00B1|\+/-\s*(\d+(?:\.\d+)?))?\s*'
+    r'(?:(?:and|to|-)\s*(\d+(?:\.\d+)?))?\s*'
+    rf'({_VALUE_UNITS})?',
+    re.IGNORECASE
+)
+
+# Age patterns
+AGE_PATTERN = re.compile(
+    r'(?:age[d]?\s*)?(\d+)\s*(?:to|-)\s*(\d+)\s*(years?)?|'
+    r'(?:age[d]?\s*)(>=|<=|>|<|≥|≤)?\s*(\d+)\s*(years?|or older|or younger)?',
+    re.IGNORECASE
+)
+
+# ULN multiplier pattern
+ULN_PATTERN = re.compile(
+    r'(\d+(?:\.\d+)?)\s*[×x]\s*(?:ULN|upper limit)',
+    re.IGNORECASE
+)
+
+# Temporal pattern
+TEMPORAL_PATTERN = re.compile(
+    r'(within|prior to|before|last|past|previous)\s*(\d+)\s*(days?|weeks?|months?|years?)',
+    re.IGNORECASE
+)
+
+_RE_ULN_UPPER_BOUND = re.compile(r'less|below|under|≤|<', re.IGNORECASE)
+_RE_AGE_CONTEXT = re.compile(r'age|year', re.IGNORECASE)
+
+# _clean_text
+# Glyphs for the CID codes common in our protocol PDFs; other (cid:N) codes are dropped
+_CID_GLYPHS = {
+    '120': '•',   # bullet
+    '182': "'",   # apostrophe (possessive)
+    '179': "'",   # left single quote
+    '180': "'",   # right single quote
+    '148': '≤',   # less than or equal
+    '149': '≥',   # greater than or equal
+    '150': '–',   # en-dash
+    '151': '—',   # em-dash
+    '177': '±',   # plus-minus
+    '85': 'r',    # letter r (common in some PDF encodings)
+    '86': 's',    # letter s
+    '87': 't',    # letter t
+    '88': 'u',    # letter u
+    '89': 'v',    # letter v
+    '90': 'w',    # letter w
+    '83': 'p',    # letter p
+    '84': 'q',    # letter q
+    '92': 'y',    # letter y
+}
+# All PDF noise removed by _clean_text, as one alternation so the text is scanned once:
+# page separators injected by parse_pdf_file / fda_processor / ocr_processor ("---PAGE---",
+# "--- PAGE 1 ---"), CID characters, "Page N of M" markers, confidentiality lines,
+# protocol version headers, Date/Version lines ("May 04, 2018. Version 5.0.") and
+# TOC-style dotted page references
+_RE_PDF_NOISE = re.compile('|'.join([
+    r'(?i:-{2,}\s*PAGE\s*\d*\s*-{2,})',
+    r'\(cid:(?P<cid>\d+)\)',
+    r'(?i:Page\s+\d+\s+of\s+\d+)',
+    r'(?im:^\s*Confidential\s*$)',
+    r'(?i:Protocol\s+(?:number|version)\s+[^\n]+)',
+    r'(?i:[A-Z][a-z]{2,8}\s+\d{1,2},?\s+\d{4}\.?\s+Version\s+[\d.]+)',
+    r'\.{3,}\s*\d+',
+]))
+
+def _pdf_noise_replacement(match) -> str:
+    cid = match.group('cid')
+    return _CID_GLYPHS.get(cid, '') if cid else ''
+
+_RE_PAGE_CONTINUATION = re.compile(r'(?<![.!?:;])\s*\n\s*\n+\s*([a-z])')
+_RE_MULTI_NEWLINE = re.compile(r'\n{3,}')
+_RE_MULTI_SPACE = re.compile(r' {2,}')
+
+# _split_criteria / _flatten_nested_criteria
+_RE_OCR_E_LINE_START = re.compile(r'(?:^|\n)\s*e\s+(?=[A-Z])')
+_RE_OCR_E_MIDLINE = re.compile(r'(?<=\w)\s+e\s+(?=[A-Z][a-z])')
+_RE_OCR_E_BEFORE_NO = re.compile(r'(?<=\w)\s+e\s+(?=No\s)')
+_RE_OCR_NO_SPACE = re.compile(r'\bNo(?=[A-Z])')
+_RE_OCR_O_LINE_START = re.compile(r'(?:^|\n)\s*o\s+(?=[A-Z])')
+_RE_OCR_O_MIDLINE = re.compile(r'(?<=\w)\s+o\s+(?=[A-Z][a-z])')
+_RE_BULLET_SPLIT = re.compile(
+    r'(?:^|\n)\s*(?:\d+[\.)]\s*|[•●○▪\-\*]\s*|[a-zA-Z]\)[\s]|[ivx]+\)|[A-Z]\.)',
+    re.IGNORECASE
+)
+_RE_CONTINUATION_START = re.compile(r'^[a-z(]')
+_RE_ITEM_TERMINAL = re.compile(r'[.!?)]\s*$')
+_RE_LOWER_START = re.compile(r'^[a-z]')
+_RE_LINE_TERMINAL = re.compile(r'[.!?:]\s*$')
+_RE_SUB_BULLET = re.compile(r'^\s*(?:o\s+|○\s*)')
+_RE_TOP_BULLET = re.compile(r'^\s*[•●▪]\s*')
+_RE_AS_FOLLOWS = re.compile(r'(?:as follows|as follows:)\s*$', re.IGNORECASE)
+
+# _is_valid_criterion: every header/noise shape that rejects a criterion, as one
+# alternation so valid criteria (the common case) cost a single scan
+_INVALID_RE = re.compile(
+    r'^[\d\s.]+$'                                   # bare numbers/dots, section numbers ("4.3.1", "38 4.")
+    r'|\.{2,}\s*\d|\d\s*\.{2,}'                      # TOC dot leaders ("... 42" / "42 ...")
+    r'|^Note\s*:'
+    r'|^(?:inclusion|exclusion|screening)\s+criteria\s*:?\s*$'
+    r'|(?-i:^[\d.]+\s*(?:Inclusion|Exclusion|Screening)\s+[Cc]riteria\b)'  # leaked section headers
+    r'|following (?:inclusion|exclusion|screening) criteria'
+    r'|must\s+meet\s+ALL\s+of\s+the\s+following'
+    r'|to\s+be\s+considered\s+eligible\s+to\s+participate'
+    r'|will be selected to participate|designed to select patients|eligibility criteria may not be waived'
+    r'|^(?:following the screening period|the following screening criteria)'
+    r'|^All relevant medical and non-medical conditions'
+    r'|page\s+\d+|version\s+\d+',
+    re.IGNORECASE
+)
+_RE_THE_FOLLOWING = re.compile(r'(?i)^the (?:following|presence of any)')
+_RE_ALPHA_RUN = re.compile(r'[a-zA-Z]{3,}')
+
+# _detect_sections: headings that end an eligibility section. The combined
+# patterns match case-insensitively throughout, numbered-heading branch included.
+_SECTION_END_HEADINGS = [
+    r'(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Study\s+(?:Drug|Treatment|Design|Procedures?|Population)|Investigational\s+Product)',
+    r'(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Removal|Withdrawal|Discontinuation)\s+(?:of\s+)?(?:Subjects?|Patients?|[Cc]riteria)',
+    r'(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Assessment|Evaluation|Endpoints?)\s',
+    r'(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Statistical|Analysis|Sample\s+Size)',
+    r'(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Schedule\s+of\s+(?:Events|Assessments))',
+    r'(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Enrolment|Enrollment)\s+Procedures',
+    r'(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Number\s+of\s+(?:Cases|Subjects?|Patients?))',
+    r'(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Prior\s+and\s+Concomitant|Excluded\s+Medications)',
+    r'(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Experimental\s+Procedures)',
+    r'(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Subject\s+Discontinuation)',
+]
+_SECTION_END_RE = re.compile(
+    '|'.join(f'({p})' for p in _SECTION_END_HEADINGS + [r'(?:\n\s*)(\d+)\.\s+[A-Z][A-Z\s]+']),
+    re.IGNORECASE
+)
+# Exclusion sections use a stricter numbered-heading branch (4+ capitals)
+_EXCLUSION_END_RE = re.compile(
+    '|'.join(f'({p})' for p in _SECTION_END_HEADINGS + [r'(?:\n\s*)(\d+)\.\s+[A-Z][A-Z\s]{3,}']),
+    re.IGNORECASE
+)
+_RE_DOT_LEADER = re.compile(r'\.{3,}')
+_RE_DECIMAL_NUMBER = re.compile(r'\d+\.\d+')
+_RE_LEADING_COLON_WS = re.compile(r'^[:\s\n]+')
+
+# _classify_screening_criterion: criterion starts with negation or describes absence
+_SCREENING_EXCLUSION_RE = re.compile(
+    r'^(?:No\s+|Must\s+not\b|Should\s+not\b|Without\s+|Absence\s+of\b|Free\s+of\b|Not\s+|Negative\s+for\b)'
+    r'|\bno\s+(?:history|signs|symptoms|condition|formal\s+contraindication|concomitant|medical\s+history|family\s+history|previous)\b',
+    re.IGNORECASE
+)
+
+# _detect_negation: explicit negation prefixes (applied to lowercased text)
+_NEGATION_PREFIX_RE = re.compile(
+    r'^(?:no\s+|not\s+|without\s+|absence\s+of|must\s+not|should\s+not|free\s+of|negative\s+for)'
+)
+
+# _extract_basic_facts (applies_to patterns run on lowercased text)
+_RE_NEWLINE_RUN = re.compile(r'\s*\n\s*')
+_RE_APPLIES_FEMALE = re.compile(r'\b(women|female|woman)\b')
+_RE_APPLIES_MALE = re.compile(r'\b(men|male|man)\b')
+
+# _classify_rule_type (applied to lowercased text)
+_RE_PREGNANCY = re.compile(r'\b(pregnant|pregnancy|breastfeeding|lactating|reproductive\s+age|contraception|birth\s+control)\b')
+_RE_CONTRACEPTION = re.compile(r'\b(contraception|birth\s+control|barrier\s+method)\b')
+_RE_AGE_RULE = re.compile(r'\b(age\s+(?:is|of|greater|less|between)|years?\s+old|[><]\s*\d+\s*years?|age\s*[>≥<≤])\b')
+_RE_WEIGHT = re.compile(r'\b(weight|kg\b|body\s+mass)')
+_RE_EKG = re.compile(r'\b(ekg|ecg|qtc|electrocardiogram)\b')
+_RE_LAB_CONTEXT = re.compile(r'(?:normal range|uln|upper limit|margin|mm3|/mm)')
+_RE_CONSENT = re.compile(r'\b(consent|willing|agree)\b')
+_RE_MEDICAL_HISTORY = re.compile(r'\b(history\s+of|prior|previous)\b')
+_RE_PROCEDURE = re.compile(r'\b(surgery|procedure|operation|resection)\b')
+_RE_MEDICATION = re.compile(r'\b(medication|drug|treatment|therapy)\b')
+_RE_ABSENCE_PREFIX = re.compile(r'^(no|not|without|absence|free\s+of)\b')
+
+# Known lab test names used to gate LAB_THRESHOLD classification
+_LAB_TEST_NAMES = (
+    'wbc', 'platelets', 'bilirubin', 'transaminase', 'alt', 'ast',
+    'creatinine', 'alkaline phosphatase', 'ggt', 'glucose', 'electrolytes',
+    'hemoglobin', 'hematocrit', 'neutrophil', 'lymphocyte', 'albumin',
+    'inr', 'potassium', 'sodium', 'calcium', 'magnesium',
+)
+_LAB_TEST_RE = re.compile(r'\b(?:' + '|'.join(_LAB_TEST_NAMES) + r')\b')
+
+
+def _build_lab_automaton():
+    automaton = ahocorasick.Automaton()
+    for name in _LAB_TEST_NAMES:
+        automaton.add_word(name, name)
+    automaton.make_automaton()
+    return automaton
+
+
+_LAB_AUTOMATON = _build_lab_automaton() if AHOCORASICK_AVAILABLE else None
+
+
+def _is_word_char(ch: str) -> bool:
+    return ch.isalnum() or ch == '_'
+
+
+def _contains_lab_test(text_lower: str) -> bool:
+    """
+    True if a known lab test name occurs as a whole word in (lowercased) text.
+    Single linear Aho-Corasick pass; hits are checked for word boundaries so
+    'alt' does not match inside 'health' (same semantics as the \\b regex).
+    """
+    if _LAB_AUTOMATON is None:
+        return _LAB_TEST_RE.search(text_lower) is not None
+    n = len(text_lower)
+    for end, name in _LAB_AUTOMATON.iter(text_lower):
+        start = end - len(name) + 1
+        if start > 0 and _is_word_char(text_lower[start - 1]):
+            continue
+        if end + 1 < n and _is_word_char(text_lower[end + 1]):
+            continue
+        return True
+    return False
+
+
+# Extracted PDF text is cached on disk keyed by file content, since OCR makes
+# re-parsing the same protocol cost seconds per page.
+_PDF_CACHE_DIR = os.path.expanduser(
+    os.getenv("PDF_TEXT_CACHE_DIR", os.path.join("~", ".cache", "drugtrial", "pdftext"))
+)
+
+
+def _pdf_cache_key(data: bytes, ocr_threshold_chars) -> str:
+    """blake2b of the PDF bytes plus the options that affect the extracted text."""
+    h = hashlib.blake2b(data, digest_size=20)
+    h.update(f"|ocr={OCR_AVAILABLE}|threshold={ocr_threshold_chars}".encode())
+    return h.hexdigest()
+
+
+def _load_pdf_cache(key: str) -> Optional[str]:
+    try:
+        with gzip.open(os.path.join(_PDF_CACHE_DIR, f"{key}.txt.gz"), "rt", encoding="utf-8") as f:
+            return f.read()
+    except (OSError, EOFError):
+        return None
+
+
+def _store_pdf_cache(key: str, text: str):
+    try:
+        os.makedirs(_PDF_CACHE_DIR, exist_ok=True)
+        final_path = os.path.join(_PDF_CACHE_DIR, f"{key}.txt.gz")
+        tmp_path = f"{final_path}.{os.getpid()}.tmp"
+        with gzip.open(tmp_path, "wt", encoding="utf-8") as f:
+            f.write(text)
+        os.replace(tmp_path, final_path)
+    except OSError as e:
+        print(f"⚠️  Could not write PDF text cache: {e}")
+
+
+def parse_pdf_file(path, ocr_threshold_chars=100, use_cache=True):
     """
     Robust text extractor supporting multiple PDF formats:
     - Try pdfplumber (best preserves layout)
     - Fallback to PyMuPDF
     - If text length is tiny for a page, optionally OCR that page (if pytesseract installed)
     Returns full concatenated text (pages separated by \n\n---PAGE---\n\n).
+    Results are cached under PDF_TEXT_CACHE_DIR keyed by the file's content hash.
+    """
+    # One sequential read; hashing and both parsers then work from memory
+    with open(path, "rb") as f:
+        data = f.read()
+    return parse_pdf_bytes(data, ocr_threshold_chars, use_cache)
+
+
+def parse_pdf_bytes(data: bytes, ocr_threshold_chars=100, use_cache=True):
+    """Same as parse_pdf_file, for a PDF already in memory (e.g. an upload body)."""
+    if not use_cache:
+        return _parse_pdf_uncached(data, ocr_threshold_chars)
+
+    key = _pdf_cache_key(data, ocr_threshold_chars)
+    cached = _load_pdf_cache(key)
+    if cached is not None:
+        return cached
+
+    text = _parse_pdf_uncached(data, ocr_threshold_chars)
+    _store_pdf_cache(key, text)
+    return text
+
+
+_PAGE_SEPARATOR = "\n\n---PAGE---\n\n"
+
+
+def _ocr_executor():
+    """
+    Thread pool for OCR'ing low-text pages while extraction continues.
+    Tesseract runs out of process, so threads overlap well here.
+    """
+    return ThreadPoolExecutor(max_workers=os.cpu_count() or 1)
+
+
+def _join_pages(pages) -> str:
     """
-    full_text_pages = []
-    # 1) pdfplumber first
+    Write page texts (or pending OCR futures) into one buffer in page order,
+    dropping each page as it is written so it isn't held twice.
+    """
+    buf = io.StringIO()
+    for i, page in enumerate(pages):
+        if i:
+            buf.write(_PAGE_SEPARATOR)
+        buf.write(page.result() if isinstance(page, Future) else page)
+        pages[i] = None
+    return buf.getvalue()
+
+
+def _probe_has_text(data: bytes, pages=3, min_chars=100) -> bool:
+    """Cheap PyMuPDF peek at the first pages to tell text PDFs from scanned ones."""
     try:
-        with pdfplumber.open(path) as pdf:
-            for page in pdf.pages:
-                text = page.extract_text() or ""
-                # If the page has little text and OCR is available, run OCR
-                if len(text.strip()) < ocr_threshold_chars and OCR_AVAILABLE:
-                    im = page.to_image(resolution=150).original
-                    text = pytesseract.image_to_string(im)
-                full_text_pages.append(text)
-        return "\n\n---PAGE---\n\n".join(full_text_pages)
+        with fitz.open(stream=data, filetype="pdf") as doc:
+            for i in range(min(pages, doc.page_count)):
+                if len(doc[i].get_text("text").strip()) >= min_chars:
+                    return True
+        return False
     except Exception:
-        pass
+        # Let the normal extraction chain decide
+        return True
 
-    # 2) PyMuPDF fallback
+
+def _parse_pdf_uncached(data: bytes, ocr_threshold_chars=100):
+    # Image-only PDFs gain nothing from pdfplumber's layout analysis; go
+    # straight to the PyMuPDF + OCR path.
+    scanned = OCR_AVAILABLE and not _probe_has_text(data, min_chars=ocr_threshold_chars)
+    # Pages needing OCR are rendered serially (the PDF handles aren't thread-safe)
+    # and OCR'd on the pool while the remaining pages are extracted.
+    executor = _ocr_executor() if OCR_AVAILABLE else None
     try:
-        doc = fitz.open(path)
-        for p in doc:
-            text = p.get_text("text") or ""
-            if len(text.strip()) < ocr_threshold_chars and OCR_AVAILABLE:
-                pix = p.get_pixmap(dpi=150)
-                img = Image.open(io.BytesIO(pix.tobytes("png")))
-                text = pytesseract.image_to_string(img)
-            full_text_pages.append(text)
-        return "\n\n---PAGE---\n\n".join(full_text_pages)
-    except Exception:
-        pass
+        # 1) pdfplumber first
+        try:
+            if scanned:
+                raise RuntimeError("image-only PDF")
+            pages = []
+            with pdfplumber.open(io.BytesIO(data)) as pdf:
+                for page in pdf.pages:
+                    text = page.extract_text() or ""
+                    # If the page has little text and OCR is available, run OCR
+                    if len(text.strip()) < ocr_threshold_chars and executor:
+                        im = page.to_image(resolution=150).original
+                        text = executor.submit(pytesseract.image_to_string, im)
+                    pages.append(text)
+                    # Drop the page's cached layout objects; they add up on long protocols
+                    page.flush_cache()
+            return _join_pages(pages)
+        except Exception:
+            pass
+
+        # 2) PyMuPDF fallback
+        try:
+            pages = []
+            with fitz.open(stream=data, filetype="pdf") as doc:
+                for p in doc:
+                    text = p.get_text("text") or ""
+                    if len(text.strip()) < ocr_threshold_chars and executor:
+                        pix = p.get_pixmap(dpi=150)
+                        img = Image.open(io.BytesIO(pix.tobytes("png")))
+                        text = executor.submit(pytesseract.image_to_string, img)
+                    pages.append(text)
+            return _join_pages(pages)
+        except Exception:
+            pass
+    finally:
+        if executor:
+            executor.shutdown(wait=True, cancel_futures=True)
 
     raise RuntimeError("Unable to parse PDF (install pdfplumber/fitz and optionally pytesseract).")
 
 
+@functools.lru_cache(maxsize=512)
+def _source_numbers(source_text: str) -> frozenset:
+    """Number tokens in a criterion, for value validation (cached per source text)."""
+    return frozenset(_NUMBER_RE.findall(source_text))
+
+
+def _run_sync(coro):
+    """
+    Run a coroutine to completion from synchronous code.
+    extract_rules is also called from async FastAPI handlers, where asyncio.run()
+    is not allowed, so in that case the coroutine runs on a helper thread's loop.
+    """
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+
+    result = {}
+
+    def runner():
+        try:
+            result["value"] = asyncio.run(coro)
+        except BaseException as e:
+            result["error"] = e
+
+    thread = threading.Thread(target=runner)
+    thread.start()
+    thread.join()
+    if "error" in result:
+        raise result["error"]
+    return result["value"]
+
+
+def _spacy_batch_size() -> int:
+    """nlp.pipe batch size for criteria; 64 suits short criterion texts."""
+    try:
+        return max(1, int(os.getenv("SPACY_BATCH_SIZE", "64")))
+    except ValueError:
+        return 64
+
+
+def _llm_max_concurrency() -> int:
+    """Max concurrent LLM requests per extraction; pair with Ollama's OLLAMA_NUM_PARALLEL."""
+    try:
+        return max(1, int(os.getenv("OLLAMA_MAX_CONCURRENCY", "5")))
+    except ValueError:
+        return 5
+
+
+def _llm_sub_batch_size() -> int:
+    """Criteria per normalization prompt; sub-batches are sent concurrently."""
+    try:
+        return max(1, int(os.getenv("LLM_SUB_BATCH_SIZE", "15")))
+    except ValueError:
+        return 15
+
+
+@functools.lru_cache(maxsize=1)
+def _sentence_splitter():
+    """Blank English pipeline with only a sentencizer, for splitting text into sentences."""
+    nlp = spacy.blank("en")
+    nlp.add_pipe("sentencizer")
+    return nlp
+
+
 class ProtocolRuleAgent:
     """
     Enhanced AI Agent for extracting structured eligibility criteria from clinical trial protocols.
@@ -83,14 +593,46 @@ class ProtocolRuleAgent:
     ANTI-HALLUCINATION: All values must be validated against source text.
     """
     
-    def __init__(self, model_name='en_core_sci_lg', load_linker=False):
-        # 1. Load shared scispaCy medical NLP model
+    # (model_name, load_linker) configs whose shared pipeline has been warmed up
+    _WARMED: set = set()
+    
+    # LLM-normalized rules (see backend.utils.llm_cache). Boilerplate criteria recur
+    # across protocols, so one cache is shared by all instances.
+    _NORM_CACHE: Optional[LLMCache] = None
+    
+    def __init__(self, model_name='en_core_sci_lg', load_linker=False, warmup=True):
+        # 1. Load shared scispaCy medical NLP model (get_nlp keeps one per config)
         from backend.nlp_utils import get_nlp, get_llm
+        cache_key = (model_name, load_linker)
         self.nlp = get_nlp(model_name, load_linker=load_linker)
+        self._model_name, self._load_linker = model_name, load_linker
         self.has_entity_linker = "scispacy_linker" in self.nlp.pipe_names
+        # UMLS KB lookups, hoisted out of the per-entity loop; first semantic type
+        # per CUI is memoized since the same concepts recur across criteria.
+        self._linker_kb = self.nlp.get_pipe("scispacy_linker").kb.cui_to_entity if self.has_entity_linker else {}
+        self._cui_first_type: Dict[str, Optional[str]] = {}
+        # Sentence splitting fallback doesn't need NER/linker, just the sentencizer
+        self._sent_nlp = _sentence_splitter()
+        
+        # Per-criterion processing only reads doc.ents, negex and (if loaded) linker
+        # CUIs; everything else (e.g. sentencizer) is skipped for those docs. Passed
+        # per nlp.pipe call rather than via select_pipes, since the pipeline is shared.
+        self._criteria_disabled_pipes = [
+            name for name in self.nlp.pipe_names if name not in _CRITERIA_PIPES
+        ]
+        
+        # Run a tiny batch once per pipeline so lazy initialisation (vectors, linker
+        # index, negex matcher) happens here rather than inside the first extraction
+        if warmup and cache_key not in ProtocolRuleAgent._WARMED:
+            list(self.nlp.pipe(["warmup eligibility criterion: age >= 18 years."] * 2,
+                               disable=self._criteria_disabled_pipes))
+            ProtocolRuleAgent._WARMED.add(cache_key)
         
-        # 2. Use shared Ollama LLM
-        self.llm = get_llm()
+        # 2. Use shared Ollama LLM in JSON mode: every prompt here expects JSON back
+        self.llm = get_llm(json_mode=True)
+        if ProtocolRuleAgent._NORM_CACHE is None:
+            ProtocolRuleAgent._NORM_CACHE = LLMCache()
+        self._norm_cache = ProtocolRuleAgent._NORM_CACHE
         
         # 5. Compile regex patterns for numeric value extraction (not for term detection)
         self._init_value_patterns()
@@ -98,6 +640,9 @@ class ProtocolRuleAgent:
         # 6. Track extracted glossary terms
         self.extracted_glossary = {}
         
+        # LLM section markers memoized by protocol-prefix hash (bounded, FIFO)
+        self._section_marker_cache: Dict[str, tuple] = {}
+        
         # 7. Generic tokens to filter out of glossary
         self.GENERIC_MEDICAL_TOKENS = {
             'history', 'signs', 'symptoms', 'women', 'men', 'patients', 'subjects', 
@@ -118,39 +663,12 @@ class ProtocolRuleAgent:
         }
     
     def _init_value_patterns(self):
-        """Initialize patterns for extracting numeric values and operators from text.
+        """Expose the module-level value patterns on the instance.
         These are for VALUE extraction, not TERM detection."""
-        
-        # Extended unit list
-        units = r'(years?|kg|mg/dL|g/dL|mL/min(?:/1\.73\s*m²?)?|×?\s*ULN|%|mmHg|msec|ms|days?|weeks?|months?|bpm|L/min|cm3|cm³)'
-        
-        # Numeric value with operator, supporting ± ranges
-        self.VALUE_PATTERN = re.compile(
-            rf'(>=|<=|>|<|≥|≤|=|between|at least|at most|more than|less than|greater than|\u00B1|\+/-)\s*'
-            r'(\d+(?:\.\d+)?)\s*(?:\u00B1|\+/-\s*(\d+(?:\.\d+)?))?\s*'
-            rf'(?:(?:and|to|-)\s*(\d+(?:\.\d+)?))?\s*'
-            rf'({units})?',
-            re.IGNORECASE
-        )
-        
-        # Age patterns
-        self.AGE_PATTERN = re.compile(
-            r'(?:age[d]?\s*)?(\d+)\s*(?:to|-)\s*(\d+)\s*(years?)?|'
-            r'(?:age[d]?\s*)(>=|<=|>|<|≥|≤)?\s*(\d+)\s*(years?|or older|or younger)?',
-            re.IGNORECASE
-        )
-        
-        # ULN multiplier pattern
-        self.ULN_PATTERN = re.compile(
-            r'(\d+(?:\.\d+)?)\s*[×x]\s*(?:ULN|upper limit)',
-            re.IGNORECASE
-        )
-        
-        # Temporal pattern
-        self.TEMPORAL_PATTERN = re.compile(
-            r'(within|prior to|before|last|past|previous)\s*(\d+)\s*(days?|weeks?|months?|years?)',
-            re.IGNORECASE
-        )
+        self.VALUE_PATTERN = VALUE_PATTERN
+        self.AGE_PATTERN = AGE_PATTERN
+        self.ULN_PATTERN = ULN_PATTERN
+        self.TEMPORAL_PATTERN = TEMPORAL_PATTERN
 
     def extract_rules(self, protocol_text: str) -> Dict[str, List[Dict]]:
         """
@@ -162,6 +680,12 @@ class ProtocolRuleAgent:
         
         ANTI-HALLUCINATION: All returned values are validated against source text.
         """
+        # 0. Fast path: text with no eligibility vocabulary at all (misclassified or
+        # criterion-free PDFs) can't yield criteria -- skip NER and the LLM entirely
+        if not _CRITERIA_MARKER_RE.search(protocol_text):
+            print("🔍 [extract_rules] No eligibility markers found, skipping extraction")
+            return {"inclusion": [], "exclusion": [], "_summary": {}}
+        
         # 1. Clean the text
         cleaned_text = self._clean_text(protocol_text)
         
@@ -193,7 +717,9 @@ class ProtocolRuleAgent:
             
             print(f"🔍 [extract_rules] Screening classified: {len(screening_extra['inclusion'])} inclusion, {len(screening_extra['exclusion'])} exclusion")
         
-        # 4. Process inclusion and exclusion sections
+        # 4. Collect valid criteria for the inclusion and exclusion sections
+        all_texts = []
+        all_categories = []
         for category in ["inclusion", "exclusion"]:
             section_text = sections.get(category, "")
             
@@ -215,40 +741,50 @@ class ProtocolRuleAgent:
                 if normalized_key not in seen_texts:
                     seen_texts.add(normalized_key)
                     unique_criteria.append(c)
-            valid_criteria = unique_criteria
-            
-            # Process all criteria using nlp.pipe (batched, much faster)
-            facts_list = []
-            criterion_docs = list(self.nlp.pipe(valid_criteria))
-            
-            for criterion_text, doc in zip(valid_criteria, criterion_docs):
-                facts = self._extract_basic_facts(criterion_text, category, doc=doc)
-                facts_list.append(facts)
-            
-            # Split into simple (skip LLM) and complex (need LLM)
-            simple_facts = []
-            complex_facts = []
-            for facts in facts_list:
-                if self._can_skip_llm(facts):
-                    simple_facts.append(facts)
-                else:
-                    complex_facts.append(facts)
-            
-            for facts in simple_facts:
+            all_texts.extend(unique_criteria)
+            all_categories.extend([category] * len(unique_criteria))
+        
+        # 5. Run NER over both sections in one nlp.pipe call (fewer, fuller batches;
+        # single process -- n_process>1 would pickle the linker KB per worker).
+        # Texts repeated across sections are parsed once, and boilerplate criteria
+        # already parsed for an earlier protocol come from the shared parse cache.
+        unique_texts = list(dict.fromkeys(all_texts))
+        docs_by_text = dict(zip(unique_texts, pipe_cached(
+            unique_texts, self._model_name, load_linker=self._load_linker,
+            disable=self._criteria_disabled_pipes, batch_size=_spacy_batch_size()
+        )))
+        
+        # Split into simple (skip LLM) and complex (need LLM), per category
+        complex_facts = {"inclusion": [], "exclusion": []}
+        for criterion_text, category in zip(all_texts, all_categories):
+            doc = docs_by_text[criterion_text]
+            facts = self._extract_basic_facts(criterion_text, category, doc=doc)
+            if self._can_skip_llm(facts):
                 final_rules[category].append(facts)
-            
-            batch_size = 40
-            for i in range(0, len(complex_facts), batch_size):
-                batch = complex_facts[i:i + batch_size]
-                normalized_batch = self._batch_normalize_with_llm(batch)
-                
-                for original_facts, normalized in zip(batch, normalized_batch):
-                    final_rule = normalized if normalized else original_facts
-                    if self._validate_against_source(final_rule, original_facts['source_text']):
-                        final_rules[category].append(final_rule)
-                    else:
-                        print(f"⚠️  Hallucination detected, using basic facts for: {original_facts['source_text'][:50]}...")
-                        final_rules[category].append(original_facts)
+            else:
+                complex_facts[category].append(facts)
+        
+        llm_batches = []  # (category, complex facts) pending LLM normalization
+        batch_size = 40
+        for category, facts_list in complex_facts.items():
+            for i in range(0, len(facts_list), batch_size):
+                llm_batches.append((category, facts_list[i:i + batch_size]))
+        
+        # 6. Normalize every batch from both sections concurrently (bounded by
+        # OLLAMA_MAX_CONCURRENCY), then validate in the original order
+        normalized_batches = (_run_sync(self._anormalize_batches([b for _, b in llm_batches]))
+                              if llm_batches else [])
+        for (category, batch), normalized_batch in zip(llm_batches, normalized_batches):
+            for original_facts, normalized in zip(batch, normalized_batch):
+                # Basic facts are read straight from the source text and are the
+                # fallback anyway, so only LLM output needs the hallucination check
+                if not normalized:
+                    final_rules[category].append(original_facts)
+                elif self._validate_against_source(normalized, original_facts['source_text']):
+                    final_rules[category].append(normalized)
+                else:
+                    print(f"⚠️  Hallucination detected, using basic facts for: {original_facts['source_text'][:50]}...")
+                    final_rules[category].append(original_facts)
         
         print(f"📊 Criteria extracted: {len(final_rules['inclusion'])} inclusion, {len(final_rules['exclusion'])} exclusion")
         
@@ -272,82 +808,26 @@ class ProtocolRuleAgent:
         text_stripped = text.strip()
         
         # Exclusion indicators: criterion starts with negation or describes absence
-        exclusion_patterns = [
-            r'^No\s+',
-            r'^Must\s+not\b',
-            r'^Should\s+not\b',
-            r'^Without\s+',
-            r'^Absence\s+of\b',
-            r'^Free\s+of\b',
-            r'^Not\s+',
-            r'^Negative\s+for\b',
-            r'(?i)\bno\s+(?:history|signs|symptoms|condition|formal\s+contraindication|concomitant|medical\s+history|family\s+history|previous)\b',
-        ]
-        
-        for pattern in exclusion_patterns:
-            if re.search(pattern, text_stripped, re.IGNORECASE):
-                return "exclusion"
+        if _SCREENING_EXCLUSION_RE.search(text_stripped):
+            return "exclusion"
         
         return "inclusion"
     
     def _clean_text(self, text: str) -> str:
         """Remove PDF artifacts, page-break noise, and normalize text."""
-        # Remove page separators injected by parse_pdf_file / fda_processor / ocr_processor
-        # Handles both "---PAGE---" and "--- PAGE 1 ---" variants
-        text = re.sub(r'-{2,}\s*PAGE\s*\d*\s*-{2,}', '', text, flags=re.IGNORECASE)
-        
-        # Replace common CID characters with their actual glyphs
-        cid_map = {
-            '120': '•',   # bullet
-            '182': "'",   # apostrophe (possessive)
-            '179': "'",   # left single quote
-            '180': "'",   # right single quote
-            '148': '≤',   # less than or equal
-            '149': '≥',   # greater than or equal
-            '150': '–',   # en-dash
-            '151': '—',   # em-dash
-            '177': '±',   # plus-minus
-            '85': 'r',    # letter r (common in some PDF encodings)
-            '86': 's',    # letter s
-            '87': 't',    # letter t
-            '88': 'u',    # letter u
-            '89': 'v',    # letter v
-            '90': 'w',    # letter w
-            '83': 'p',    # letter p
-            '84': 'q',    # letter q
-            '92': 'y',    # letter y
-        }
-        for cid_num, replacement in cid_map.items():
-            text = text.replace(f'(cid:{cid_num})', replacement)
-        
-        # Remove any remaining CID characters
-        text = re.sub(r'\(cid:\d+\)', '', text)
-        
-        # Remove page markers
-        text = re.sub(r'(?i)Page\s+\d+\s+of\s+\d+', '', text)
-        
-        # Remove confidentiality markers
-        text = re.sub(r'(?i)^\s*Confidential\s*$', '', text, flags=re.MULTILINE)
-        
-        # Remove protocol version headers (more robust, stop at newline)
-        text = re.sub(r'(?i)Protocol\s+(?:number|version)\s+[^\n]+', '', text)
-        
-        # Remove Date/Version lines (e.g. "May 04, 2018. Version 5.0.")
-        text = re.sub(r'(?i)[A-Z][a-z]{2,8}\s+\d{1,2},?\s+\d{4}\.?\s+Version\s+[\d.]+', '', text)
-        
-        # Remove TOC-style dotted lines with page numbers
-        text = re.sub(r'\.{3,}\s*\d+', '', text)
+        # Strip PDF noise and resolve CID glyphs in a single pass
+        text = _RE_PDF_NOISE.sub(_pdf_noise_replacement, text)
         
         # Stitch page-break continuations: if a line ends mid-sentence
         # (no terminal punctuation like . ! ? :) and the next non-empty line
         # starts with a lowercase letter, join them on one line.
         # This reconnects text split across PDF pages (e.g. "...exposure to\n\n\ntreatment.").
         # The negative lookbehind ensures we don't merge after sentence-ending punctuation.
-        text = re.sub(r'(?<![.!?:;])\s*\n\s*\n+\s*([a-z])', r' \1', text)
+        text = _RE_PAGE_CONTINUATION.sub(r' \1', text)
         
         # Normalize whitespace
-        text = re.sub(r'\n{3,}', '\n\n', text)
-        text = re.sub(r' {2,}', ' ', text)
+        text = _RE_MULTI_NEWLINE.sub('\n\n', text)
+        text = _RE_MULTI_SPACE.sub(' ', text)
         
         return text.strip()
     
@@ -360,29 +840,10 @@ class ProtocolRuleAgent:
         sections = {"inclusion": "", "exclusion": "", "screening": "", "lab_values": "", "withdrawal": ""}
         
         # Section header patterns - these mark the START of sections
-        section_patterns = {
-            'screening': r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Screening\s+[Cc]riteria|Selection\s+of\s+Patients|Eligibility\s+[Cc]riteria|Selection\s+[Cc]riteria)',
-            'inclusion': r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Inclusion\s+[Cc]riteria|[Cc]riteria\s+for\s+[Ii]nclusion)',
-            'exclusion': r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Exclusion\s+[Cc]riteria|[Cc]riteria\s+for\s+[Ee]xclusion)',
-        }
-        
-        # Section END patterns - these mark where eligibility sections typically end
-        end_patterns = [
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Study\s+(?:Drug|Treatment|Design|Procedures?|Population)|Investigational\s+Product)',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Removal|Withdrawal|Discontinuation)\s+(?:of\s+)?(?:Subjects?|Patients?|[Cc]riteria)',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Assessment|Evaluation|Endpoints?)\s',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Statistical|Analysis|Sample\s+Size)',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Schedule\s+of\s+(?:Events|Assessments))',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Enrolment|Enrollment)\s+Procedures',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Number\s+of\s+(?:Cases|Subjects?|Patients?))',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Prior\s+and\s+Concomitant|Excluded\s+Medications)',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Experimental\s+Procedures)',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Subject\s+Discontinuation)',
-            r'(?:\n\s*)(\d+)\.\s+[A-Z][A-Z\s]+',
-        ]
+        section_patterns = _SECTION_PATTERNS
         
-        # Combine end patterns
-        end_pattern = '|'.join(f'({p})' for p in end_patterns)
+        # Section END patterns mark where eligibility sections typically end
+        end_pattern = _SECTION_END_RE
         
         # Strategy: Find the CLUSTER of section headers (screening + inclusion + exclusion)
         # that appear close together in the document. The actual eligibility section will have
@@ -391,32 +852,19 @@ class ProtocolRuleAgent:
         print(f"🔍 [_detect_sections] Text length: {len(text)}")
         
         # Exclusion-specific end patterns (stricter)
-        exclusion_end_patterns = [
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Study\s+(?:Drug|Treatment|Design|Procedures?|Population)|Investigational\s+Product)',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Removal|Withdrawal|Discontinuation)\s+(?:of\s+)?(?:Subjects?|Patients?|[Cc]riteria)',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Assessment|Evaluation|Endpoints?)\s',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Statistical|Analysis|Sample\s+Size)',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Schedule\s+of\s+(?:Events|Assessments))',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Enrolment|Enrollment)\s+Procedures',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Number\s+of\s+(?:Cases|Subjects?|Patients?))',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Prior\s+and\s+Concomitant|Excluded\s+Medications)',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Experimental\s+Procedures)',
-            r'(?i)(?:\n\s*)(?:\d+\.?\d*\.?\s*)?(?:Subject\s+Discontinuation)',
-            r'(?:\n\s*)(\d+)\.\s+[A-Z][A-Z\s]{3,}',
-        ]
-        exc_end_pattern = '|'.join(f'({p})' for p in exclusion_end_patterns)
+        exc_end_pattern = _EXCLUSION_END_RE
         
         # Collect all match positions for each section type
         all_matches = {}
         for section_name in ['screening', 'inclusion', 'exclusion']:
             pattern = section_patterns[section_name]
-            matches = list(re.finditer(pattern, text))
+            matches = list(pattern.finditer(text))
             # Filter out TOC entries (preceded by dotted lines)
             filtered = []
             for m in matches:
                 ctx_start = max(0, m.start() - 80)
                 ctx = text[ctx_start:m.start()]
-                if not re.search(r'\.{3,}', ctx):
+                if not _RE_DOT_LEADER.search(ctx):
                     filtered.append(m)
             all_matches[section_name] = filtered
             print(f"🔍 [_detect_sections] Pattern '{section_name}': {len(filtered)} matches (of {len(matches)} total)")
@@ -438,7 +886,7 @@ class ProtocolRuleAgent:
                     continue
                 
                 # Score: prefer numbered sections (e.g. "4.2. Inclusion criteria")
-                has_number = bool(re.search(r'\d+\.\d+', inc_m.group()))
+                has_number = bool(_RE_DECIMAL_NUMBER.search(inc_m.group()))
                 score = 1000 if has_number else 0
                 # Prefer later in document (actual body, not synopsis)
                 score += inc_m.start() / len(text) * 500
@@ -468,10 +916,10 @@ class ProtocolRuleAgent:
             if next_match:
                 section_end = next_match.start()
             else:
-                end_m = re.search(fallback_end_pattern, text[search_start:])
-                section_end = search_start + end_m.start() if end_m else min(search_start + 8000, len(text))
+                end_m = fallback_end_pattern.search(text, search_start)
+                section_end = end_m.start() if end_m else min(search_start + 8000, len(text))
             content = text[search_start:section_end].strip()
-            content = re.sub(r'^[:\s\n]+', '', content)
+            content = _RE_LEADING_COLON_WS.sub('', content)
             if len(content) > 8000:
                 content = content[:8000]
             return content
@@ -499,10 +947,36 @@ class ProtocolRuleAgent:
         Use LLM to identify section boundaries in non-standard protocols.
         Returns only content that exists in the source text.
         """
+        sections = {"inclusion": "", "exclusion": "", "screening": "", "lab_values": "", "withdrawal": ""}
+        
+        inc_start, exc_start = self._llm_section_markers(text[:4000])
+        
+        # ANTI-HALLUCINATION: Verify markers exist in text before using
+        if inc_start and inc_start in text:
+            inc_pos = text.find(inc_start)
+            exc_pos = text.find(exc_start) if exc_start and exc_start in text else len(text)
+            sections['inclusion'] = text[inc_pos:exc_pos] if inc_pos < exc_pos else text[inc_pos:]
+        
+        if exc_start and exc_start in text:
+            exc_pos = text.find(exc_start)
+            sections['exclusion'] = text[exc_pos:]
+        
+        return sections
+    
+    def _llm_section_markers(self, text_prefix: str) -> tuple:
+        """
+        Ask the LLM for the (inclusion_start, exclusion_start) marker strings.
+        The LLM only ever sees the first 4000 chars, so answers are memoized by a
+        hash of that prefix -- documents sharing a header reuse the result.
+        """
+        key = hashlib.blake2b(text_prefix.encode(), digest_size=16).hexdigest()
+        if key in self._section_marker_cache:
+            return self._section_marker_cache[key]
+        
         prompt = f"""Analyze this clinical trial protocol and identify the text sections containing eligibility criteria.
 
 PROTOCOL TEXT (first 4000 characters):
-{text[:4000]}
+{text_prefix}
 
 TASK: Return a JSON object with these keys, containing ONLY text that appears VERBATIM in the protocol:
 - "inclusion_start": The exact text that marks the start of inclusion criteria (or null if not found)
@@ -512,40 +986,19 @@ CRITICAL: Return ONLY valid JSON. DO NOT INCLUDE COMMENTS (//) or any explanator
 JSON:"""
 
         try:
-            response = self.llm.invoke(prompt)
-            
-            # Robust JSON extraction: first { and last }
-            start = response.find('{')
-            end = response.rfind('}')
+            # JSON-mode LLM: the response is a JSON document, no cleanup needed
+            markers = orjson.loads(self.llm.invoke(prompt))
             
-            if start != -1 and end != -1:
-                json_str = response[start:end+1]
-                # Remove control characters before parsing
-                json_str = "".join(ch for ch in json_str if ord(ch) >= 32 or ch == '\n' or ch == '\r')
-                # Remove // style comments
-                json_str = re.sub(r'//.*', '', json_str)
-                markers = json.loads(json_str)
-                
-                sections = {"inclusion": "", "exclusion": "", "screening": "", "lab_values": "", "withdrawal": ""}
-                
-                # ANTI-HALLUCINATION: Verify markers exist in text before using
-                inc_start = markers.get('inclusion_start')
-                exc_start = markers.get('exclusion_start')
-                
-                if inc_start and inc_start in text:
-                    inc_pos = text.find(inc_start)
-                    exc_pos = text.find(exc_start) if exc_start and exc_start in text else len(text)
-                    sections['inclusion'] = text[inc_pos:exc_pos] if inc_pos < exc_pos else text[inc_pos:]
-                
-                if exc_start and exc_start in text:
-                    exc_pos = text.find(exc_start)
-                    sections['exclusion'] = text[exc_pos:]
-                
-                return sections
+            if isinstance(markers, dict):
+                result = (markers.get('inclusion_start'), markers.get('exclusion_start'))
+                if len(self._section_marker_cache) >= 128:
+                    self._section_marker_cache.pop(next(iter(self._section_marker_cache)))
+                self._section_marker_cache[key] = result
+                return result
         except Exception as e:
             print(f"⚠️  LLM section detection failed: {e}")
         
-        return {"inclusion": "", "exclusion": "", "screening": "", "lab_values": "", "withdrawal": ""}
+        return (None, None)
     
     def _split_criteria(self, section_text: str) -> List[str]:
         """
@@ -562,24 +1015,20 @@ JSON:"""
         # Step 1: Handle OCR bullet artifacts FIRST (before flatten, so multi-bullet
         # lines get split into separate lines for proper parent-child detection).
         # Common in PDFs where • becomes 'e' or 'o' through OCR.
-        text = re.sub(r'(?:^|\n)\s*e\s+(?=[A-Z])', '\n• ', text)
-        text = re.sub(r'(?<=\w)\s+e\s+(?=[A-Z][a-z])', '\n• ', text)
-        text = re.sub(r'(?<=\w)\s+e\s+(?=No\s)', '\n• ', text)
+        text = _RE_OCR_E_LINE_START.sub('\n• ', text)
+        text = _RE_OCR_E_MIDLINE.sub('\n• ', text)
+        text = _RE_OCR_E_BEFORE_NO.sub('\n• ', text)
         # Fix "Nocondition" / "Noconcomitant" OCR artifacts (missing space after "No")
-        text = re.sub(r'\bNo(?=[A-Z])', 'No ', text)
+        text = _RE_OCR_NO_SPACE.sub('No ', text)
         # Also handle 'o' as sub-bullet at line start or mid-line
-        text = re.sub(r'(?:^|\n)\s*o\s+(?=[A-Z])', '\n○ ', text)
-        text = re.sub(r'(?<=\w)\s+o\s+(?=[A-Z][a-z])', '\n○ ', text)
+        text = _RE_OCR_O_LINE_START.sub('\n○ ', text)
+        text = _RE_OCR_O_MIDLINE.sub('\n○ ', text)
         
         # Step 2: Handle nested parent-child structures.
         text = self._flatten_nested_criteria(text)
         
         # Step 3: Try splitting on bullet-like tokens
-        items = re.split(
-            r'(?:^|\n)\s*(?:\d+[\.)]\s*|[•●○▪\-\*]\s*|[a-zA-Z]\)[\s]|[ivx]+\)|[A-Z]\.)',
-            text,
-            flags=re.IGNORECASE
-        )
+        items = _RE_BULLET_SPLIT.split(text)
         items = [it.strip() for it in items if it and len(it.strip()) > 0]
 
         # Step 3: Handle continuation lines (fragments that belong to previous item)
@@ -589,8 +1038,8 @@ JSON:"""
         for it in items:
             is_continuation = (
                 merged
-                and re.match(r'^[a-z(]', it)
-                and not re.search(r'[.!?)]\s*$', merged[-1])
+                and _RE_CONTINUATION_START.match(it)
+                and not _RE_ITEM_TERMINAL.search(merged[-1])
             )
             if is_continuation:
                 merged[-1] += ' ' + it
@@ -609,7 +1058,7 @@ JSON:"""
                 # previous line doesn't end with terminal punctuation, append it
                 line_merged = []
                 for ln in substantial_lines:
-                    if line_merged and re.match(r'^[a-z]', ln) and not re.search(r'[.!?:]\s*$', line_merged[-1]):
+                    if line_merged and _RE_LOWER_START.match(ln) and not _RE_LINE_TERMINAL.search(line_merged[-1]):
                         line_merged[-1] += ' ' + ln
                     else:
                         line_merged.append(ln)
@@ -621,7 +1070,7 @@ JSON:"""
             if section_text.count(';') >= 2:
                 merged = [s.strip() for s in section_text.split(';') if s.strip()]
             else:
-                doc = self.nlp(section_text)
+                doc = self._sent_nlp(section_text)
                 merged = [sent.text.strip() for sent in doc.sents if sent.text.strip()]
 
         return merged
@@ -653,31 +1102,31 @@ JSON:"""
                 continue
             
             # Detect TRUE sub-items: "o " prefix or "○ " (typically indented under a parent)
-            is_sub_bullet = bool(re.match(r'^\s*(?:o\s+|○\s*)', line))
+            is_sub_bullet = bool(_RE_SUB_BULLET.match(line))
             # Detect top-level bullets: "• " prefix
-            is_top_bullet = bool(re.match(r'^\s*[•●▪]\s*', line))
+            is_top_bullet = bool(_RE_TOP_BULLET.match(line))
             
             if is_sub_bullet and pending_parent is not None:
                 # Child of a parent header -- promote to standalone top-level bullet
-                child_text = re.sub(r'^\s*(?:o\s+|○\s*)', '', line).strip()
+                child_text = _RE_SUB_BULLET.sub('', line).strip()
                 if child_text:
                     result_lines.append('• ' + child_text)
             elif is_sub_bullet and not pending_parent:
                 # Sub-bullet without parent -- promote to top-level bullet
-                child_text = re.sub(r'^\s*(?:o\s+|○\s*)', '', line).strip()
+                child_text = _RE_SUB_BULLET.sub('', line).strip()
                 if child_text:
                     result_lines.append('• ' + child_text)
             elif is_top_bullet:
                 # Top-level bullet -- check if it's a parent header
-                bullet_text = re.sub(r'^\s*[•●▪]\s*', '', line).strip()
-                if bullet_text.endswith(':') or re.search(r'(?:as follows|as follows:)\s*$', bullet_text, re.IGNORECASE):
+                bullet_text = _RE_TOP_BULLET.sub('', line).strip()
+                if bullet_text.endswith(':') or _RE_AS_FOLLOWS.search(bullet_text):
                     # This bullet is a parent header (e.g. "• Lab values ... as follows:")
                     pending_parent = bullet_text.rstrip(':').strip()
                 else:
                     # Regular top-level bullet -- KEEP the bullet marker
                     pending_parent = None
                     result_lines.append(line)
-            elif stripped.endswith(':') or re.search(r'(?:as follows|as follows:)\s*$', stripped, re.IGNORECASE):
+            elif stripped.endswith(':') or _RE_AS_FOLLOWS.search(stripped):
                 # Non-bullet parent header -- remember it but don't emit
                 pending_parent = stripped.rstrip(':').strip()
             else:
@@ -695,56 +1144,18 @@ JSON:"""
         if len(text) < 15:
             return False
         
-        # Just numbers and dots (TOC artifacts like "38 4." or ".... 42")
-        if re.match(r'^[\d\s\.]+$', text):
-            return False
-        
-        # Table of contents patterns (various dot leader formats)
-        if re.search(r'\.{2,}\s*\d+', text):  # ".... 42"
-            return False
-        if re.search(r'\d+\s*\.{2,}', text):  # "42 ...."
-            return False
-        if re.search(r'^[\d\.]+\s*$', text):  # Just "38 4."
-            return False
-        
         # Header patterns/Introductory sentences
         if text.endswith(':') and len(text) < 80:
             return False
-        # Notes and explanatory text
-        if re.match(r'^Note\s*:', text, re.IGNORECASE):
-            return False
-        if re.match(r'^(?:inclusion|exclusion|screening)\s+criteria\s*:?\s*$', text, re.IGNORECASE):
-            return False
-        # Section headers that leaked into content (e.g. "8.3.2 Exclusion Criteria To be considered...")
-        if re.match(r'^[\d.]+\s*(?:Inclusion|Exclusion|Screening)\s+[Cc]riteria\b', text):
-            return False
-        if "following inclusion criteria" in text.lower() or "following exclusion criteria" in text.lower():
-            return False
-        if "following screening criteria" in text.lower():
-            return False
-        if re.search(r'(?i)must\s+meet\s+ALL\s+of\s+the\s+following', text):
-            return False
-        if re.search(r'(?i)to\s+be\s+considered\s+eligible\s+to\s+participate', text):
-            return False
-        if re.search(r'(?i)will be selected to participate|designed to select patients|eligibility criteria may not be waived', text):
-            return False
-        if re.search(r'(?i)^the (?:following|presence of any)', text) and len(text.split('.')[0]) > 60:
-            return False
-        if re.search(r'(?i)^(?:following the screening period|the following screening criteria)', text):
-            return False
-        if re.search(r'(?i)^All relevant medical and non-medical conditions', text):
-            return False
         
-        # Page/version markers
-        if re.search(r'(?i)page\s+\d+|version\s+\d+', text):
+        # Must contain some alphabetic characters
+        if not _RE_ALPHA_RUN.search(text):
             return False
         
-        # Section numbers only (like "4.2" or "4.3.1")
-        if re.match(r'^\d+(\.\d+)*\s*$', text):
+        # TOC artifacts, section headers, boilerplate, page/version markers
+        if _INVALID_RE.search(text):
             return False
-        
-        # Must contain some alphabetic characters
-        if not re.search(r'[a-zA-Z]{3,}', text):
+        if _RE_THE_FOLLOWING.search(text) and len(text.split('.')[0]) > 60:
             return False
         
         return True
@@ -759,15 +1170,19 @@ JSON:"""
             doc = self.nlp(text)
         
         entities = self._extract_entities(doc, text)
+        # Lowercased once and shared by the negation, rule-type and applies_to checks
+        text_lower = text.lower()
         
         # 2. Detect negation context
-        is_negated = self._detect_negation(text, doc)
+        is_negated = self._detect_negation(text, doc, text_lower)
         
-        # 3. Extract numeric values and operators
-        values = self._extract_values(text)
+        # 3. Extract numeric values and operators. The ULN/age/value and temporal
+        # patterns all need a digit, so one scan gates all four.
+        has_digit = _DIGIT_RE.search(text) is not None
+        values = self._extract_values(text) if has_digit else None
         
         # 4. Determine rule type based on entities and values
-        rule_type = self._classify_rule_type(text, entities, values)
+        rule_type = self._classify_rule_type(text, entities, values, text_lower)
         
         # 5. Build structured rule
         rule = {
@@ -786,24 +1201,20 @@ JSON:"""
             medical_entities = [e for e in entities if e.get('semantic_type') in medical_types]
             
             # 2. Filter out generic tokens
-            meaningful_entities = [e for e in entities if e['text'].lower().strip() not in self.GENERIC_MEDICAL_TOKENS and len(e['text'].strip()) > 2]
+            meaningful_entities = [e for e in entities if e['_norm'] not in self.GENERIC_MEDICAL_TOKENS and len(e['_norm']) > 2]
             
-            # 3. Among meaningful entities, prefer longer names (more descriptive)
-            meaningful_entities.sort(key=lambda e: len(e['text']), reverse=True)
-            
-            # 4. Preference order: Specific Medical > Longest Non-Generic > First Entity
+            # 3. Preference order: Specific Medical > Longest Non-Generic > First Entity
+            # Longer names are more descriptive; max() keeps the first of equal length
             if medical_entities:
-                # Among medical entities, prefer longer names
-                medical_entities.sort(key=lambda e: len(e['text']), reverse=True)
-                primary_entity = medical_entities[0]
+                primary_entity = max(medical_entities, key=lambda e: len(e['text']))
             elif meaningful_entities:
-                primary_entity = meaningful_entities[0]
+                primary_entity = max(meaningful_entities, key=lambda e: len(e['text']))
             else:
                 primary_entity = entities[0]
                 
             field_text = primary_entity.get("text", "").strip()
             # Clean newlines and cap field length for UI display
-            field_text = re.sub(r'\s*\n\s*', ' ', field_text)
+            field_text = _RE_NEWLINE_RUN.sub(' ', field_text)
             if len(field_text) > 60:
                 field_text = field_text[:57] + "..."
             rule["field"] = field_text
@@ -823,15 +1234,15 @@ JSON:"""
                 rule["unit"] = values["unit"]
         
         # Add temporal constraints
-        temporal = self._extract_temporal(text)
+        temporal = self._extract_temporal(text) if has_digit else None
         if temporal:
             rule["temporal_window"] = temporal.get("window")
             rule["temporal_unit"] = temporal.get("unit")
         
         # Determine applies_to
-        if re.search(r'\b(women|female|woman)\b', text, re.IGNORECASE):
+        if _RE_APPLIES_FEMALE.search(text_lower):
             rule["applies_to"] = "FEMALE"
-        elif re.search(r'\b(men|male|man)\b', text, re.IGNORECASE):
+        elif _RE_APPLIES_MALE.search(text_lower):
             rule["applies_to"] = "MALE"
         else:
             rule["applies_to"] = "ALL"
@@ -841,9 +1252,16 @@ JSON:"""
     def _extract_rule(self, text: str, category: str) -> Optional[Dict]:
         """
         Extract a single structured rule. 
-        Note: The batch version (_batch_normalize_with_llm) is faster and preferred.
+        Deprecated: extract_rules batches NER and LLM normalization across all
+        criteria and is much faster.
         """
-        facts = self._extract_basic_facts(text, category)
+        warnings.warn(
+            "_extract_rule is deprecated; use extract_rules, which batches NER and LLM calls",
+            DeprecationWarning,
+            stacklevel=2
+        )
+        doc = next(iter(self.nlp.pipe([text], disable=self._criteria_disabled_pipes)))
+        facts = self._extract_basic_facts(text, category, doc=doc)
         normalized = self._normalize_with_llm(text, facts)
         
         if normalized and self._validate_against_source(normalized, text):
@@ -857,6 +1275,7 @@ JSON:"""
         for ent in doc.ents:
             entity = {
                 "text": ent.text,
+                "_norm": ent.text.strip().lower(),  # normalized once for token filtering
                 "label": ent.label_,
                 "start": ent.start_char,
                 "end": ent.end_char
@@ -869,25 +1288,27 @@ JSON:"""
                 entity["confidence"] = score
                 
                 # Get semantic type from UMLS linker
-                linker = self.nlp.get_pipe("scispacy_linker")
-                if cui in linker.kb.cui_to_entity:
-                    entity["semantic_type"] = list(linker.kb.cui_to_entity[cui].types)[0] if linker.kb.cui_to_entity[cui].types else None
+                if cui in self._cui_first_type:
+                    entity["semantic_type"] = self._cui_first_type[cui]
+                else:
+                    ent_info = self._linker_kb.get(cui)
+                    if ent_info is not None:
+                        entity["semantic_type"] = self._cui_first_type[cui] = (
+                            ent_info.types[0] if ent_info.types else None
+                        )
             
             entities.append(entity)
         
         return entities
     
-    def _detect_negation(self, text: str, doc) -> bool:
+    def _detect_negation(self, text: str, doc, text_lower: Optional[str] = None) -> bool:
         """Detect if the criterion contains negation."""
-        # Check explicit negation patterns
-        negation_patterns = [
-            r'^no\s+', r'^not\s+', r'^without\s+', r'^absence\s+of',
-            r'^must\s+not', r'^should\s+not', r'^free\s+of', r'^negative\s+for'
-        ]
+        if text_lower is None:
+            text_lower = text.lower()
         
-        for pattern in negation_patterns:
-            if re.search(pattern, text, re.IGNORECASE):
-                return True
+        # Check explicit negation patterns
+        if _NEGATION_PREFIX_RE.search(text_lower):
+            return True
         
         # Check negspacy negation on entities
         for ent in doc.ents:
@@ -898,6 +1319,11 @@ JSON:"""
     
     def _extract_values(self, text: str) -> Optional[Dict]:
         """Extract numeric values and operators from text."""
+        # Every value pattern needs a digit; criteria without one (the majority)
+        # skip the three pattern scans entirely.
+        if not _DIGIT_RE.search(text):
+            return None
+        
         result = {}
         
         # Check for ULN pattern first
@@ -905,12 +1331,12 @@ JSON:"""
         if uln_match:
             result["value"] = uln_match.group(1)
             result["unit"] = "× ULN"
-            result["operator"] = "<=" if re.search(r'less|below|under|≤|<', text, re.IGNORECASE) else ">="
+            result["operator"] = "<=" if _RE_ULN_UPPER_BOUND.search(text) else ">="
             return result
         
         # Check for age pattern
         age_match = self.AGE_PATTERN.search(text)
-        if age_match and re.search(r'age|year', text, re.IGNORECASE):
+        if age_match and _RE_AGE_CONTEXT.search(text):
             groups = age_match.groups()
             if groups[0] and groups[1]:  # Range: X to Y years
                 result["value"] = groups[0]
@@ -937,17 +1363,13 @@ JSON:"""
         
         return None
     
-    def _normalize_operator(self, op: str) -> str:
-        """Normalize operator to standard format."""
+    @staticmethod
+    @functools.lru_cache(maxsize=64)
+    def _normalize_operator(op: str) -> str:
+        """Normalize operator to standard format.
+        Operators come from a tiny vocabulary, so results are memoized."""
         op = op.lower().strip()
-        mapping = {
-            '>=': '>=', '≥': '>=', 'at least': '>=', 'greater than or equal': '>=', 'more than or equal': '>=',
-            '<=': '<=', '≤': '<=', 'at most': '<=', 'less than or equal': '<=',
-            '>': '>', 'greater than': '>', 'more than': '>', 'above': '>',
-            '<': '<', 'less than': '<', 'below': '<', 'under': '<',
-            '=': '='
-        }
-        return mapping.get(op, op.upper())
+        return _OPERATOR_MAP.get(op, op.upper())
     
     def _extract_temporal(self, text: str) -> Optional[Dict]:
         """Extract temporal constraints from text."""
@@ -959,38 +1381,34 @@ JSON:"""
             }
         return None
     
-    def _classify_rule_type(self, text: str, entities: List[Dict], values: Optional[Dict]) -> str:
+    def _classify_rule_type(self, text: str, entities: List[Dict], values: Optional[Dict],
+                            text_lower: Optional[str] = None) -> str:
         """Classify the rule type based on content."""
-        text_lower = text.lower()
+        if text_lower is None:
+            text_lower = text.lower()
         
         # Check for specific patterns
         
         # 1. Pregnancy/Reproductive Status (Prioritize over Age)
-        if re.search(r'\b(pregnant|pregnancy|breastfeeding|lactating|reproductive\s+age|contraception|birth\s+control)\b', text_lower):
-            if re.search(r'\b(contraception|birth\s+control|barrier\s+method)\b', text_lower):
+        if _RE_PREGNANCY.search(text_lower):
+            if _RE_CONTRACEPTION.search(text_lower):
                 return "CONTRACEPTION"
             return "PREGNANCY_EXCLUSION"
 
         # 2. Age (Stricter regex to avoid 'reproductive age')
-        if re.search(r'\b(age\s+(?:is|of|greater|less|between)|years?\s+old|[><]\s*\d+\s*years?|age\s*[>≥<≤])\b', text_lower):
+        if _RE_AGE_RULE.search(text_lower):
             return "AGE"
         
         # 2b. Weight
-        if re.search(r'\b(weight|kg\b|body\s+mass)', text_lower) and re.search(r'\d', text):
+        if _RE_WEIGHT.search(text_lower) and _DIGIT_RE.search(text):
             return "WEIGHT"
         
-        if re.search(r'\b(ekg|ecg|qtc|electrocardiogram)\b', text_lower):
+        if _RE_EKG.search(text_lower):
             return "EKG"
         
         # Lab values -- detect by unit OR by known lab test names
-        lab_test_names = [
-            'wbc', 'platelets', 'bilirubin', 'transaminase', 'alt', 'ast',
-            'creatinine', 'alkaline phosphatase', 'ggt', 'glucose', 'electrolytes',
-            'hemoglobin', 'hematocrit', 'neutrophil', 'lymphocyte', 'albumin',
-            'inr', 'potassium', 'sodium', 'calcium', 'magnesium',
-        ]
-        if re.search(r'\b(?:' + '|'.join(lab_test_names) + r')\b', text_lower):
-            if re.search(r'(?:normal range|uln|upper limit|margin|mm3|/mm)', text_lower):
+        if _contains_lab_test(text_lower):
+            if _RE_LAB_CONTEXT.search(text_lower):
                 return "LAB_THRESHOLD"
         
         if values and values.get("unit"):
@@ -1000,16 +1418,16 @@ JSON:"""
             if 'mmhg' in unit:
                 return "VITAL_SIGN"
         
-        if re.search(r'\b(consent|willing|agree)\b', text_lower):
+        if _RE_CONSENT.search(text_lower):
             return "CONSENT_REQUIREMENT"
         
-        if re.search(r'\b(history\s+of|prior|previous)\b', text_lower):
+        if _RE_MEDICAL_HISTORY.search(text_lower):
             return "MEDICAL_HISTORY"
         
-        if re.search(r'\b(surgery|procedure|operation|resection)\b', text_lower):
+        if _RE_PROCEDURE.search(text_lower):
             return "PROCEDURE_HISTORY"
         
-        if re.search(r'\b(medication|drug|treatment|therapy)\b', text_lower):
+        if _RE_MEDICATION.search(text_lower):
             return "MEDICATION_HISTORY"
         
         # Check entity types
@@ -1021,7 +1439,7 @@ JSON:"""
                 return "MEDICATION_HISTORY"
         
         # Check for negation indicating absence
-        if re.search(r'^(no|not|without|absence|free\s+of)\b', text_lower):
+        if _RE_ABSENCE_PREFIX.search(text_lower):
             return "CONDITION_ABSENT"
         
         return "CONDITION_PRESENT"
@@ -1032,68 +1450,31 @@ JSON:"""
         
         ANTI-HALLUCINATION: Strict prompting to prevent value invention.
         """
-        prompt = f"""You are a clinical trial criteria normalizer. Your job is to format extracted data, NOT to infer or guess.
-
-SOURCE TEXT:
-"{text}"
-
-EXTRACTED FACTS:
-{json.dumps(facts, indent=2)}
-
-STRICT RULES:
-1. ONLY USE VALUES THAT APPEAR IN THE SOURCE TEXT
-2. If a value is not in the source text, use null
-3. Do not infer operators, units, or values not explicitly stated
-4. Field names should match medical terminology in the source
-5. This is for {facts.get('category', 'INCLUSION')} criteria
-6. RETURN ONLY GENUINE JSON. NO COMMENTS (//), NO MARKDOWN, NO EXPLANATIONS.
-
-Return a clean JSON object with these fields:
-- rule_type: {facts.get('rule_type', 'CONDITION_PRESENT')}
-- category: {facts.get('category', 'INCLUSION')}
-- field: The specific medical parameter, drug, or clinical condition (e.g., 'ALT level', 'history of cardiomyopathy', 'Benznidazole'). AVOID generic terms like 'Women', 'History', or 'Signs'.
-- operator: The comparison operator (>=, <=, >, <, =, BETWEEN, PRESENT, ABSENT)
-- value: The numeric value or null
-- value2: Second value for ranges or null
-- unit: The unit of measurement or null
-- applies_to: ALL, MALE, or FEMALE
-- negated: true or false
-- source_text: "{text}"
-
-PHASE 2 ENHANCEMENTS (extract if present in source text):
-- temporal: {{"window": <number>, "unit": "months"}} for time constraints like "within 6 months" or "in the past year"
-- scope: "personal" (default) or "family" if explicitly mentions "family history"
-- value_list: ["item1", "item2", ...] for multi-value rules like "warfarin, apixaban, or rivaroxaban"
-- group: {{"group_id": "auto", "logic": "AND/OR"}} for compound rules with multiple connected parts (use null for single rules)
-
-JSON:"""
+        # Constant instruction text lives in module-level segments; only the
+        # criterion-specific fields are interleaved per call.
+        category = str(facts.get('category', 'INCLUSION'))
+        prompt = ''.join((
+            _NORMALIZE_PROMPT_HEAD, text,
+            _NORMALIZE_PROMPT_FACTS, '\n'.join(f'{k}={_prompt_value(v)}' for k, v in facts.items() if v is not None),
+            _NORMALIZE_PROMPT_RULES, category,
+            _NORMALIZE_PROMPT_FIELDS, str(facts.get('rule_type', 'CONDITION_PRESENT')),
+            _NORMALIZE_PROMPT_CATEGORY, category,
+            _NORMALIZE_PROMPT_FIELD_SPEC, text,
+            _NORMALIZE_PROMPT_TAIL,
+        ))
 
         try:
             response = self.llm.invoke(prompt)
             
-            # Clean generic markdown
-            cleaned_response = response.replace('```json', '').replace('```', '').strip()
-            
-            # Robust JSON extraction: first { and last }
-            start = cleaned_response.find('{')
-            end = cleaned_response.rfind('}')
-            
-            if start != -1 and end != -1:
-                json_str = cleaned_response[start:end+1]
-                
-                # Remove control characters that break JSON parsing (0-31 except \n \r \t)
-                json_str = "".join(ch for ch in json_str if ord(ch) >= 32 or ch in ['\n', '\r', '\t'])
-                
-                # Remove // style comments that break standard JSON parsing
-                json_str = re.sub(r'//.*', '', json_str)
-                
+            # JSON-mode LLM: the response is a JSON document, no cleanup needed
+            normalized = orjson.loads(response)
+            if isinstance(normalized, dict):
                 return normalized
-            else:
-                print(f"⚠️  No JSON found in LLM response for: {text[:50]}...")
-                print(f"DEBUG: LLM Response: {response}")
+            print(f"⚠️  No JSON object in LLM response for: {text[:50]}...")
+            print(f"DEBUG: LLM Response: {response}")
         except Exception as e:
             print(f"⚠️  LLM normalization error: {e}")
-            print(f"DEBUG: Failed JSON string: {json_str if 'json_str' in locals() else 'N/A'}")
+            print(f"DEBUG: LLM Response: {response if 'response' in locals() else 'N/A'}")
         
         return None
 
@@ -1120,91 +1501,186 @@ JSON:"""
     def _batch_normalize_with_llm(self, batch: List[Dict]) -> List[Optional[Dict]]:
         """
         Optimize by processing multiple criteria in one LLM call.
-        Uses larger sub-batches and more parallel workers for throughput.
+        Synchronous wrapper around _abatch_normalize_with_llm.
+        """
+        if not batch: return []
+        return _run_sync(self._abatch_normalize_with_llm(batch))
+
+    async def _anormalize_batches(self, batches: List[List[Dict]]) -> List[List[Optional[Dict]]]:
+        """Normalize several batches concurrently, sharing one in-flight request cap."""
+        semaphore = asyncio.Semaphore(_llm_max_concurrency())
+        return await asyncio.gather(
+            *(self._abatch_normalize_with_llm(batch, semaphore) for batch in batches)
+        )
+
+    async def _abatch_normalize_with_llm(self, batch: List[Dict],
+                                         semaphore: Optional[asyncio.Semaphore] = None) -> List[Optional[Dict]]:
+        """
+        Async batch normalization: sub-batches are sent with llm.ainvoke and
+        awaited together, with at most `semaphore` requests in flight.
         """
         if not batch: return []
+        if semaphore is None:
+            semaphore = asyncio.Semaphore(_llm_max_concurrency())
+        
+        # Boilerplate criteria repeat verbatim -- serve previously normalized ones
+        # from the cache and only send each remaining distinct text once
+        unique_batch = []
+        pending = {}  # cache key -> index in unique_batch
+        resolved = {}  # cache key -> normalized rule (or None)
+        keys = []
+        for facts in batch:
+            key = self._norm_cache_key(facts)
+            keys.append(key)
+            if key in resolved or key in pending:
+                continue
+            cached = self._norm_cache.get(key)
+            if cached is not None:
+                resolved[key] = cached
+            else:
+                pending[key] = len(unique_batch)
+                unique_batch.append(facts)
+        
+        if not unique_batch:
+            print(f"⚡ All {len(batch)} criteria served from normalization cache")
+        
+        # Larger sub-batches = fewer LLM calls; smaller ones fan out across more
+        # concurrent requests and keep each prompt well inside the context window
+        sub_batch_size = _llm_sub_batch_size()
+        sub_batches = [unique_batch[i:i + sub_batch_size] for i in range(0, len(unique_batch), sub_batch_size)]
         
-        from concurrent.futures import ThreadPoolExecutor
+        async def invoke(prompt):
+            async with semaphore:
+                return await self.llm.ainvoke(prompt)
         
-        # Larger sub-batches = fewer LLM calls = faster overall
-        sub_batch_size = 15
-        sub_batches = [batch[i:i + sub_batch_size] for i in range(0, len(batch), sub_batch_size)]
+        responses = await asyncio.gather(
+            *(invoke(self._build_batch_prompt(sub_batch)) for sub_batch in sub_batches),
+            return_exceptions=True
+        )
+        
+        unique_results = []
+        retry = []  # (position in unique_results, facts) from unusable batch responses
+        for sub_batch, response in zip(sub_batches, responses):
+            parsed = self._parse_batch_response(sub_batch, response)
+            if parsed is None:
+                if len(sub_batch) > 1:
+                    retry.extend((len(unique_results) + j, facts) for j, facts in enumerate(sub_batch))
+                parsed = [None] * len(sub_batch)
+            unique_results.extend(parsed)
+        
+        # Malformed or misaligned batch responses fall back to one prompt per criterion
+        if retry:
+            print(f"🔁 Retrying {len(retry)} criteria individually")
+            single_responses = await asyncio.gather(
+                *(invoke(self._build_batch_prompt([facts])) for _, facts in retry),
+                return_exceptions=True
+            )
+            for (idx, facts), response in zip(retry, single_responses):
+                parsed = self._parse_batch_response([facts], response)
+                if parsed:
+                    unique_results[idx] = parsed[0]
+        
+        for key, idx in pending.items():
+            resolved[key] = unique_results[idx]
+            if unique_results[idx] is not None:
+                self._norm_cache.set(key, unique_results[idx])
+        
+        stats = self._norm_cache.stats
+        print(f"📦 Normalization cache: {stats['hits']} hits, {stats['misses']} misses")
         
-        def process_sub_batch(sub_batch):
-            prompt = f"""You are a clinical trial criteria normalizer. Format these {len(sub_batch)} criteria into structured JSON.
+        # Fan results back out to every original position
+        all_results = []
+        for key, facts in zip(keys, batch):
+            result = resolved[key]
+            if result is not None:
+                result = copy.copy(result)
+                result["source_text"] = facts["source_text"]
+            all_results.append(result)
+                
+        return all_results
+
+    @staticmethod
+    def _norm_cache_key(facts: Dict) -> str:
+        # Category is part of the key: the same text normalizes differently as an
+        # inclusion vs an exclusion criterion
+        return LLMCache.make_key(facts['source_text'], facts.get('category'), facts.get('rule_type'))
+
+    def _build_batch_prompt(self, sub_batch: List[Dict]) -> str:
+        """Build the normalization prompt for one sub-batch of criteria."""
+        return f"""You are a clinical trial criteria normalizer. Format these {len(sub_batch)} criteria into structured JSON.
             
 STRICT RULES:
 1. ONLY USE VALUES THAT APPEAR IN THE SOURCE TEXT.
-2. NO COMMENTS (//), NO MARKDOWN, NO EXPLANATIONS.
-3. RETURN A JSON ARRAY of objects.
+2. RETURN A JSON OBJECT {{"rules": [...]}} with exactly one object per criterion, in the same order.
 
 CRITERIA TO PROCESS:
-{json.dumps(sub_batch, indent=2)}
+{orjson.dumps(sub_batch).decode()}
 
-Return a JSON ARRAY where each object has these fields:
+Each object in "rules" has these fields:
 - rule_type, category, field, operator, value, value2, unit, applies_to, negated, source_text
 
-JSON ARRAY:"""
-
-            try:
-                response = self.llm.invoke(prompt)
-                cleaned_response = response.replace('```json', '').replace('```', '').strip()
-                
-                start = cleaned_response.find('[')
-                end = cleaned_response.rfind(']')
-                
-                if start != -1 and end != -1:
-                    json_str = cleaned_response[start:end+1]
-                    json_str = "".join(ch for ch in json_str if ord(ch) >= 32 or ch in ['\n', '\r', '\t'])
-                    json_str = re.sub(r'//.*', '', json_str)
-                    
-                    sub_normalized = json.loads(json_str)
-                    
-                    # Ensure results match sub_batch size
-                    results = []
-                    for i, original in enumerate(sub_batch):
-                        match = None
-                        if i < len(sub_normalized):
-                            match = sub_normalized[i]
-                        
-                        if match:
-                            for f in ["value", "value2", "field"]:
-                                if match.get(f) is not None:
-                                    match[f] = str(match[f])
-                            match["source_text"] = original["source_text"]
-                        results.append(match)
-                    return results
-            except Exception as e:
-                print(f"⚠️  Small batch normalization failed: {e}")
-            return [None] * len(sub_batch)
+JSON:"""
 
-        # Execute sub-batches in parallel with more workers
-        all_results = []
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            future_results = list(executor.map(process_sub_batch, sub_batches))
-            for res_list in future_results:
-                all_results.extend(res_list)
-                
-        return all_results
+    def _parse_batch_response(self, sub_batch: List[Dict], response) -> Optional[List[Optional[Dict]]]:
+        """
+        Parse one sub-batch LLM response into a list aligned with sub_batch.
+        Returns None if the response is unusable: malformed JSON, or an array
+        whose length doesn't match, since items can't then be aligned by position.
+        """
+        try:
+            if isinstance(response, Exception):
+                raise response
+            # JSON mode guarantees a JSON document; rules come wrapped in {"rules": [...]}
+            sub_normalized = orjson.loads(response)
+            if isinstance(sub_normalized, dict):
+                # A lone criterion may come back as the rule object itself
+                if "rules" in sub_normalized:
+                    sub_normalized = sub_normalized["rules"]
+                elif len(sub_batch) == 1:
+                    sub_normalized = [sub_normalized]
+            
+            if not isinstance(sub_normalized, list) or len(sub_normalized) != len(sub_batch):
+                print(f"⚠️  Batch response has {len(sub_normalized) if isinstance(sub_normalized, list) else 'no'} "
+                      f"items for {len(sub_batch)} criteria")
+                return None
+            
+            results = []
+            for original, match in zip(sub_batch, sub_normalized):
+                if not isinstance(match, dict):
+                    match = None
+                if match:
+                    for f in ["value", "value2", "field"]:
+                        if match.get(f) is not None:
+                            match[f] = str(match[f])
+                    match["source_text"] = original["source_text"]
+                results.append(match)
+            return results
+        except Exception as e:
+            print(f"⚠️  Small batch normalization failed: {e}")
+        return None
     
     def _validate_against_source(self, rule: Dict, source_text: str) -> bool:
         """
         ANTI-HALLUCINATION: Validate that extracted values exist in source text.
         """
-        source_lower = source_text.lower()
+        source_numbers = _source_numbers(source_text)
         
         # Check numeric values
         for field in ["value", "value2"]:
             value = rule.get(field)
-            if value and value not in ["null", "true", "false", "True", "False"]:
+            if value and value not in _NON_VALUE_LITERALS:
                 value_str = str(value)
+                # Numeric values (the common case) are a set lookup against the
+                # source's number tokens
+                digits = _NUMBER_RE.findall(value_str)
+                if digits and not source_numbers.isdisjoint(digits):
+                    continue
                 # Allow for some formatting differences (1.5 vs 1.50)
-                if value_str not in source_text and value_str.rstrip('0').rstrip('.') not in source_text:
-                    # Check if any digits match
-                    digits = re.findall(r'\d+\.?\d*', value_str)
-                    if digits and not any(d in source_text for d in digits):
-                        print(f"⚠️  Value '{value}' not found in source text")
-                        return False
+                if value_str in source_text or value_str.rstrip('0').rstrip('.') in source_text:
+                    continue
+                if digits:
+                    print(f"⚠️  Value '{value}' not found in source text")
+                    return False
         
         return True
     
@@ -1225,20 +1701,27 @@ if __name__ == "__main__":
         "/app/uploads/fda_documents/3.pdf",
     ]
     
+    existing = []
     for p in pdf_paths:
-        if not Path(p).exists():
+        if Path(p).exists():
+            existing.append(p)
+        else:
             print(f"\n⚠️  Skipping {p} - file not found")
-            continue
-            
-        print(f"\n\n{'='*80}\nProcessing: {p}\n{'='*80}")
-        try:
-            txt = parse_pdf_file(p)
-            rules = agent.extract_rules(txt)
-            print("\n📊 Rule Type Summary:")
-            print(json.dumps(rules.get('_summary', {}), indent=2))
-            print("\n📋 Sample Rules (first 3 per category):")
-            print(json.dumps({k: rules[k][:3] for k in ['inclusion','exclusion'] if rules.get(k)}, indent=2))
-        except Exception as e:
-            print(f"❌ ERROR parsing {p}: {e}")
-            import traceback
-            traceback.print_exc()
+    
+    # PDF text extraction (and OCR) is CPU-bound: parse all files in parallel
+    # processes, then run rule extraction as each result comes back in order
+    with ProcessPoolExecutor(max_workers=min(len(existing), os.cpu_count() or 1) or 1) as pool:
+        futures = [pool.submit(parse_pdf_file, p) for p in existing]
+        for p, future in zip(existing, futures):
+            print(f"\n\n{'='*80}\nProcessing: {p}\n{'='*80}")
+            try:
+                txt = future.result()
+                rules = agent.extract_rules(txt)
+                print("\n📊 Rule Type Summary:")
+                print(orjson.dumps(rules.get('_summary', {}), option=orjson.OPT_INDENT_2, default=str).decode())
+                print("\n📋 Sample Rules (first 3 per category):")
+                print(orjson.dumps({k: rules[k][:3] for k in ['inclusion','exclusion'] if rules.get(k)}, option=orjson.OPT_INDENT_2, default=str).decode())
+            except Exception as e:
+                print(f"❌ ERROR parsing {p}: {e}")
+                import traceback
+                traceback.print_exc()
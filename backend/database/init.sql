@@ -39,7 +39,7 @@ CREATE TABLE IF NOT EXISTS conditions (
     id SERIAL PRIMARY KEY,
     start_date DATE NOT NULL,
     stop_date DATE,
-    patient_id VARCHAR(10) REFERENCES patients(id),
+    patient_id VARCHAR(10) REFERENCES patients(id) ON DELETE CASCADE,
     encounter_id VARCHAR(10),
     system VARCHAR(100),
     code VARCHAR(20),
@@ -55,7 +55,7 @@ CREATE TABLE IF NOT EXISTS medications (
     id SERIAL PRIMARY KEY,
     start_date DATE NOT NULL,
     stop_date DATE,
-    patient_id VARCHAR(10) REFERENCES patients(id),
+    patient_id VARCHAR(10) REFERENCES patients(id) ON DELETE CASCADE,
     payer_id VARCHAR(10),
     encounter_id VARCHAR(10),
     code VARCHAR(20),
@@ -76,7 +76,7 @@ CREATE INDEX idx_medications_code ON medications(code);
 CREATE TABLE IF NOT EXISTS observations (
     id SERIAL PRIMARY KEY,
     observation_date DATE NOT NULL,
-    patient_id VARCHAR(10) REFERENCES patients(id),
+    patient_id VARCHAR(10) REFERENCES patients(id) ON DELETE CASCADE,
     encounter_id VARCHAR(10),
     category VARCHAR(50),
     code VARCHAR(20),
@@ -97,7 +97,7 @@ CREATE TABLE IF NOT EXISTS allergies (
     id SERIAL PRIMARY KEY,
     start_date DATE,
     stop_date DATE,
-    patient_id VARCHAR(10) REFERENCES patients(id),
+    patient_id VARCHAR(10) REFERENCES patients(id) ON DELETE CASCADE,
     encounter_id VARCHAR(10),
     code VARCHAR(20),
     description TEXT,
@@ -116,7 +116,7 @@ CREATE INDEX idx_allergies_patient ON allergies(patient_id);
 CREATE TABLE IF NOT EXISTS immunizations (
     id SERIAL PRIMARY KEY,
     immunization_date DATE NOT NULL,
-    patient_id VARCHAR(10) REFERENCES patients(id),
+    patient_id VARCHAR(10) REFERENCES patients(id) ON DELETE CASCADE,
     encounter_id VARCHAR(10),
     code VARCHAR(20),
     description TEXT,
@@ -166,7 +166,7 @@ CREATE INDEX idx_eligibility_trial ON eligibility_criteria(trial_id);
 -- Patient Eligibility Results Table
 CREATE TABLE IF NOT EXISTS patient_eligibility (
     id SERIAL PRIMARY KEY,
-    patient_id VARCHAR(10) REFERENCES patients(id),
+    patient_id VARCHAR(10) REFERENCES patients(id) ON DELETE CASCADE,
     trial_id INTEGER REFERENCES clinical_trials(id),
     eligibility_status VARCHAR(20), -- 'eligible', 'not_eligible', 'unknown'
     confidence_score DECIMAL(5, 4),
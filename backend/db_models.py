@@ -3,7 +3,8 @@ Database Models and Setup
 Using PostgreSQL via SQLAlchemy
 """
  
-from sqlalchemy import create_engine, Column, Integer, String, Date, Float, Boolean, Text, DateTime, ForeignKey, JSON
+from sqlalchemy import create_engine, Column, Integer, String, Date, Float, Boolean, Text, DateTime, ForeignKey, JSON, Index, UniqueConstraint
+from sqlalchemy import text as sql_text
 from sqlalchemy.ext.declarative import declarative_base
 from sqlalchemy.orm import sessionmaker, relationship
 from datetime import datetime
@@ -30,19 +31,19 @@ class Patient(Base):
     age_group = Column(String(20)) # e.g. "30-40"
     original_id_hash = Column(String(64), index=True) # For idempotent imports
    
-    # Relationships
-    conditions = relationship("Condition", back_populates="patient")
-    medications = relationship("Medication", back_populates="patient")
-    observations = relationship("Observation", back_populates="patient")
-    allergies = relationship("Allergy", back_populates="patient")
-    immunizations = relationship("Immunization", back_populates="patient")
+    # Relationships (dependent rows are removed by ON DELETE CASCADE in the database)
+    conditions = relationship("Condition", back_populates="patient", passive_deletes=True)
+    medications = relationship("Medication", back_populates="patient", passive_deletes=True)
+    observations = relationship("Observation", back_populates="patient", passive_deletes=True)
+    allergies = relationship("Allergy", back_populates="patient", passive_deletes=True)
+    immunizations = relationship("Immunization", back_populates="patient", passive_deletes=True)
  
 class Condition(Base):
     __tablename__ = 'conditions'
    
     id = Column(Integer, primary_key=True, autoincrement=True)
     start_date = Column(Date, nullable=False)
-    patient_id = Column(String(50), ForeignKey('patients.id'))
+    patient_id = Column(String(50), ForeignKey('patients.id', ondelete='CASCADE'))
     code = Column(String(20))
     description = Column(Text)
     scope = Column(String(20), default='personal')  # 'personal' or 'family'
@@ -54,7 +55,7 @@ class Medication(Base):
    
     id = Column(Integer, primary_key=True, autoincrement=True)
     start_date = Column(Date, nullable=False)
-    patient_id = Column(String(50), ForeignKey('patients.id'))
+    patient_id = Column(String(50), ForeignKey('patients.id', ondelete='CASCADE'))
     code = Column(String(20))
     description = Column(Text)
    
@@ -65,7 +66,7 @@ class Observation(Base):
    
     id = Column(Integer, primary_key=True, autoincrement=True)
     observation_date = Column(Date, nullable=False)
-    patient_id = Column(String(50), ForeignKey('patients.id'))
+    patient_id = Column(String(50), ForeignKey('patients.id', ondelete='CASCADE'))
     code = Column(String(20))
     description = Column(Text)
     value = Column(String(50))
@@ -78,7 +79,7 @@ class Allergy(Base):
    
     id = Column(Integer, primary_key=True, autoincrement=True)
     start_date = Column(Date)
-    patient_id = Column(String(50), ForeignKey('patients.id'))
+    patient_id = Column(String(50), ForeignKey('patients.id', ondelete='CASCADE'))
     code = Column(String(20))
     description = Column(Text)
     allergy_type = Column("type", String(50))  # allergy, adverse reaction
@@ -95,7 +96,7 @@ class Immunization(Base):
    
     id = Column(Integer, primary_key=True, autoincrement=True)
     immunization_date = Column(Date, nullable=False)
-    patient_id = Column(String(50), ForeignKey('patients.id'))
+    patient_id = Column(String(50), ForeignKey('patients.id', ondelete='CASCADE'))
     code = Column(String(20))
     description = Column(Text)
     base_cost = Column(Float)
@@ -141,24 +142,35 @@ class EligibilityCriteria(Base):
     temporal_window_months = Column(Integer, nullable=True)
     scope = Column(String(20), default='personal', nullable=True, index=True)  # 'personal' or 'family'
     value_list = Column(JSON, nullable=True)  # For multi-drug/multi-value rules
+   
+    __table_args__ = (
+        # Same name as init.sql's index, so docker and ORM-created schemas share one
+        Index('idx_eligibility_trial', 'trial_id'),
+    )
  
 class PatientEligibility(Base):
     __tablename__ = 'patient_eligibility'
    
     id = Column(Integer, primary_key=True, autoincrement=True)
-    patient_id = Column(String(50), ForeignKey('patients.id'))
+    patient_id = Column(String(50), ForeignKey('patients.id', ondelete='CASCADE'))
     trial_id = Column(Integer, ForeignKey('clinical_trials.id'))
     organization_id = Column(Integer, nullable=True) # Link to Node.js organizations table
     eligibility_status = Column(String(20))
     confidence_score = Column(Float)
     evaluation_date = Column(DateTime, default=datetime.utcnow)
+   
+    __table_args__ = (
+        # One result per patient and trial (the API updates in place); named like the
+        # constraint init.sql's UNIQUE(patient_id, trial_id) gets, so both schemas match
+        UniqueConstraint('patient_id', 'trial_id', name='patient_eligibility_patient_id_trial_id_key'),
+    )
  
 class EligibilityAudit(Base):
     __tablename__ = 'eligibility_audits'
    
     id = Column(Integer, primary_key=True, autoincrement=True)
     trial_id = Column(Integer, ForeignKey('clinical_trials.id'))
-    patient_id = Column(String(50), ForeignKey('patients.id'))
+    patient_id = Column(String(50), ForeignKey('patients.id', ondelete='CASCADE'))
     organization_id = Column(Integer, nullable=True) # Link to Node.js organizations table
     matched_at = Column(DateTime, default=datetime.utcnow)
     status = Column(String(50))  # ELIGIBLE, INELIGIBLE, UNCERTAIN
@@ -167,11 +179,15 @@ class EligibilityAudit(Base):
     criteria_total = Column(Integer)
     details = Column(JSON)  # Stores breakdown of mismatched criteria
    
+    __table_args__ = (
+        Index('ix_eligibility_audits_trial_patient', 'trial_id', 'patient_id'),
+    )
+   
 class PatientVault(Base):
     __tablename__ = 'patient_vault'
    
     id = Column(Integer, primary_key=True, autoincrement=True)
-    patient_id = Column(String(50), ForeignKey('patients.id'), unique=True)
+    patient_id = Column(String(50), ForeignKey('patients.id', ondelete='CASCADE'), unique=True)
     encrypted_pii = Column(JSON) # Stores original SSN, Name, Address securely
     created_at = Column(DateTime, default=datetime.utcnow)
    
@@ -297,11 +313,67 @@ class AuditLog(Base):
     previous_hash = Column(String(64)) # Hash of the previous log entry for chaining
     entry_hash = Column(String(64))    # Hash of this entry (calculated by Auditor)
  
+# Indexes added after the initial schema; IF NOT EXISTS makes these no-ops once applied
+_INDEX_MIGRATIONS = [
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS idx_eligibility_trial ON eligibility_criteria (trial_id)",
+    "CREATE INDEX CONCURRENTLY IF NOT EXISTS ix_eligibility_audits_trial_patient ON eligibility_audits (trial_id, patient_id)",
+]
+ 
 # Database setup
 # Use singleton pattern for engine and sessionmaker to avoid "Too many connections"
 _engine = None
 _SessionLocal = None
  
+_MIGRATED = False
+ 
+# Columns added after the first release; IF NOT EXISTS makes them no-ops on current schemas
+_COLUMN_MIGRATIONS = [
+    "ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS analysis_results JSON",
+    "ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS analysis_status VARCHAR(20) DEFAULT 'pending'",
+    "ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS document_id INTEGER",
+    "ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS fda_1571 JSON",
+    "ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS fda_1572 JSON",
+    "ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS matching_config JSON",
+    "ALTER TABLE patient_eligibility ADD COLUMN IF NOT EXISTS organization_id INTEGER",
+]
+ 
+def _run_migrations(engine):
+    """Create missing tables, columns and indexes. Serialized across workers with an advisory lock."""
+    global _MIGRATED
+    if _MIGRATED:
+        return
+    import logging
+    logger = logging.getLogger(__name__)
+    
+    # CREATE INDEX CONCURRENTLY can't run inside a transaction, so the whole job runs in autocommit
+    with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        conn.execute(sql_text("SELECT pg_advisory_lock(hashtext('drugtrial_migrations'))"))
+        try:
+            # Index builds on large tables can outlast an opt-in DB_STATEMENT_TIMEOUT_MS
+            conn.execute(sql_text("SET statement_timeout = 0"))
+            
+            # Create tables if they don't exist (safe with PostgreSQL)
+            Base.metadata.create_all(conn)
+            
+            # Auto-migrate: add new columns to existing tables
+            try:
+                for ddl in _COLUMN_MIGRATIONS:
+                    conn.execute(sql_text(ddl))
+            except Exception as e:
+                logger.warning(f"Auto-migration warning: {e}")
+            
+            # Auto-migrate: lookup indexes for tables created before they were declared.
+            # CONCURRENTLY avoids locking writers.
+            for ddl in _INDEX_MIGRATIONS:
+                try:
+                    conn.execute(sql_text(ddl))
+                except Exception as e:
+                    logger.warning(f"Auto-migration warning: {e}")
+        finally:
+            conn.execute(sql_text("SELECT pg_advisory_unlock(hashtext('drugtrial_migrations'))"))
+    
+    _MIGRATED = True
+ 
 def get_database():
     """Create and return database engine and session factory"""
     global _engine, _SessionLocal
@@ -313,33 +385,105 @@ def get_database():
         if not db_url:
             raise ValueError("DATABASE_URL environment variable is not set. Please configure it to point to your PostgreSQL database.")
            
-        # Create engine
-        _engine = create_engine(db_url, echo=False)
+        # Create engine with a tuned pool: pre-ping drops stale connections before use,
+        # recycle stays under server/proxy idle timeouts, LIFO keeps a few connections hot.
+        # Sizes default to SQLAlchemy's own (5 + 10 overflow); every worker process gets
+        # its own pool, so raise them per deployment against Postgres' max_connections.
+        connect_args = {"keepalives": 1, "keepalives_idle": 30}
+        statement_timeout_ms = os.getenv("DB_STATEMENT_TIMEOUT_MS")
+        if statement_timeout_ms:
+            connect_args["options"] = f"-c statement_timeout={int(statement_timeout_ms)}"
+        _engine = create_engine(
+            db_url,
+            echo=False,
+            pool_size=int(os.getenv("DB_POOL_SIZE", "5")),
+            max_overflow=int(os.getenv("DB_MAX_OVERFLOW", "10")),
+            pool_pre_ping=True,
+            pool_recycle=1800,
+            pool_use_lifo=True,
+            connect_args=connect_args,
+        )
        
-        # Create tables if they don't exist (safe with PostgreSQL)
-        Base.metadata.create_all(_engine)
-        
-        # Auto-migrate: add new columns to existing tables
-        from sqlalchemy import text as sa_text
-        with _engine.connect() as conn:
-            try:
-                conn.execute(sa_text("ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS analysis_results JSON"))
-                conn.execute(sa_text("ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS analysis_status VARCHAR(20) DEFAULT 'pending'"))
-                conn.execute(sa_text("ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS document_id INTEGER"))
-                conn.execute(sa_text("ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS fda_1571 JSON"))
-                conn.execute(sa_text("ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS fda_1572 JSON"))
-                conn.execute(sa_text("ALTER TABLE clinical_trials ADD COLUMN IF NOT EXISTS matching_config JSON"))
-                conn.execute(sa_text("ALTER TABLE patient_eligibility ADD COLUMN IF NOT EXISTS organization_id INTEGER"))
-                conn.commit()
-            except Exception as e:
-                import logging
-                logging.getLogger(__name__).warning(f"Auto-migration warning: {e}")
+        # Create/upgrade the schema on first use (idempotent, serialized by an advisory
+        # lock); secondary workers can skip it with RUN_MIGRATIONS=0
+        if os.getenv("RUN_MIGRATIONS", "1") != "0":
+            _run_migrations(_engine)
         
         _SessionLocal = sessionmaker(bind=_engine)
        
     return _engine, _SessionLocal
  
+def dispose_engine():
+    """Close all pooled connections (application shutdown)."""
+    if _engine is not None:
+        _engine.dispose()
+ 
 def get_session():
     """Get database session"""
     _, SessionLocal = get_database()
-    return SessionLocal()
\ No newline at end of file
+    return SessionLocal()
+ 
+def db_session():
+    """FastAPI dependency: a pooled session, closed when the request is done with it"""
+    session = get_session()
+    try:
+        yield session
+    finally:
+        session.close()
+ 
+# Columns written by bulk_insert_criteria, in COPY order
+_CRITERIA_COPY_COLUMNS = [
+    "trial_id", "criterion_id", "criterion_type", "text", "category", "operator", "value",
+    "unit", "negated", "structured_data", "group_id", "group_logic",
+    "temporal_window_months", "scope", "value_list",
+]
+_CRITERIA_JSON_COLUMNS = {"structured_data", "value_list"}
+ 
+def _copy_csv_field(value) -> str:
+    """One COPY CSV field: NULL is an unquoted empty field, so every string is quoted
+    (an empty string stays '' instead of loading as NULL)."""
+    if value is None:
+        return ""
+    if isinstance(value, bool):
+        return "t" if value else "f"
+    if isinstance(value, (int, float)):
+        return str(value)
+    return '"' + str(value).replace('"', '""') + '"'
+ 
+def _criteria_copy_line(row) -> str:
+    import orjson
+    fields = []
+    for col in _CRITERIA_COPY_COLUMNS:
+        value = row.get(col)
+        if col in _CRITERIA_JSON_COLUMNS and value is not None:
+            value = orjson.dumps(value, default=str).decode()
+        fields.append(_copy_csv_field(value))
+    return ",".join(fields) + "\n"
+ 
+def bulk_insert_criteria(session, rows) -> int:
+    """Insert many eligibility_criteria rows (dicts of column values) with one COPY.
+    Falls back to an executemany INSERT on drivers without COPY support.
+    Runs in the session's transaction; the caller commits."""
+    import io
+    rows = list(rows)
+    if not rows:
+        return 0
+    for row in rows:
+        row.setdefault("negated", False)
+        row.setdefault("scope", "personal")
+ 
+    if session.get_bind().dialect.driver != "psycopg2":
+        from sqlalchemy import insert
+        session.execute(insert(EligibilityCriteria), rows)
+        return len(rows)
+ 
+    buf = io.StringIO("".join(_criteria_copy_line(row) for row in rows))
+    cursor = session.connection().connection.cursor()
+    try:
+        cursor.copy_expert(
+            f"COPY eligibility_criteria ({', '.join(_CRITERIA_COPY_COLUMNS)}) FROM STDIN WITH (FORMAT csv)",
+            buf,
+        )
+    finally:
+        cursor.close()
+    return len(rows)
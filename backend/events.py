@@ -1,48 +1,81 @@
-from typing import Callable, List, Dict, Any
+from typing import Callable, Dict, Any, Optional, Tuple
+from contextvars import ContextVar
 import logging
 import asyncio
 
 logger = logging.getLogger(__name__)
 
+# Event currently being dispatched; gather() copies the context into each handler task
+current_event_type: ContextVar[str] = ContextVar("current_event_type", default="")
+
 class EventBus:
     def __init__(self):
-        self._subscribers: Dict[str, List[Callable]] = {}
+        # event type -> (sync handlers, async handlers). Handlers are classified once
+        # at subscribe time; the tuples are replaced, never mutated, so publish can
+        # iterate its snapshot without locking even if someone subscribes meanwhile
+        self._subscribers: Dict[str, Tuple[Tuple[Callable, ...], Tuple[Callable, ...]]] = {}
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
 
     def subscribe(self, event_type: str, handler: Callable):
-        if event_type not in self._subscribers:
-            self._subscribers[event_type] = []
-        self._subscribers[event_type].append(handler)
+        # Remember the serving loop so sync code on worker threads can publish onto it
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            pass
+        sync_handlers, async_handlers = self._subscribers.get(event_type, ((), ()))
+        if asyncio.iscoroutinefunction(handler):
+            async_handlers += (handler,)
+        else:
+            sync_handlers += (handler,)
+        self._subscribers[event_type] = (sync_handlers, async_handlers)
         logger.info(f"Subscribed {handler.__name__} to {event_type}")
 
     async def publish(self, event_type: str, data: Any):
         """
         Publish an event to all subscribers.
-        Handlers are executed asynchronously.
+        Sync handlers run inline, async handlers concurrently; one failing
+        handler doesn't block the others.
         """
         logger.info(f"Publishing event {event_type}")
-        if event_type in self._subscribers:
-            tasks = []
-            for handler in self._subscribers[event_type]:
-                # Create a task for each handler to run them concurrently
-                # and ensure one failing handler doesn't block others
-                tasks.append(self._run_handler(handler, data, event_type))
-            
-            # We don't wait for them here if we want fire-and-forget from the publisher's perspective
-            # But usually we want to await them if we are already in an async context?
-            # Creating tasks schedules them on the event loop.
-            # If the caller awaits publish(), we should probably await all tasks.
-            await asyncio.gather(*tasks, return_exceptions=True)
-
-    async def _run_handler(self, handler, data, event_type):
+        handlers = self._subscribers.get(event_type)
+        if not handlers:
+            return
+        sync_handlers, async_handlers = handlers
+        token = current_event_type.set(event_type)
+        try:
+            for handler in sync_handlers:
+                try:
+                    handler(data)
+                except Exception as e:
+                    self._log_failure(handler, e)
+            if async_handlers:
+                await asyncio.gather(*(self._run_handler(h, data) for h in async_handlers), return_exceptions=True)
+        finally:
+            current_event_type.reset(token)
+
+    def publish_threadsafe(self, event_type: str, data: Any):
+        """
+        Fire-and-forget publish from synchronous code running off the event loop
+        (e.g. FastAPI background tasks in the threadpool). Handlers run on the
+        serving loop; falls back to a private loop when none is running.
+        """
+        loop = self._loop
+        if loop is not None and loop.is_running():
+            asyncio.run_coroutine_threadsafe(self.publish(event_type, data), loop)
+        else:
+            asyncio.run(self.publish(event_type, data))
+
+    async def _run_handler(self, handler, data):
         try:
-            if asyncio.iscoroutinefunction(handler):
-                await handler(data)
-            else:
-                handler(data)
+            await handler(data)
         except Exception as e:
-            logger.error(f"Error in handler {handler.__name__} for event {event_type}: {e}")
-            import traceback
-            logger.error(traceback.format_exc())
+            self._log_failure(handler, e)
+
+    @staticmethod
+    def _log_failure(handler, e):
+        logger.error(f"Error in handler {handler.__name__} for event {current_event_type.get()}: {e}")
+        import traceback
+        logger.error(traceback.format_exc())
 
 # Global instance
 event_bus = EventBus()
@@ -0,0 +1,27 @@
+-- Cascade patient deletes to dependent rows so removing patients is a single
+-- DELETE FROM patients WHERE id = ANY(...) instead of one DELETE per table.
+
+DO $$
+DECLARE
+    t TEXT;
+BEGIN
+    FOREACH t IN ARRAY ARRAY[
+        'conditions', 'medications', 'observations', 'allergies', 'immunizations',
+        'patient_eligibility', 'eligibility_audits', 'patient_vault'
+    ]
+    LOOP
+        IF to_regclass(t) IS NOT NULL THEN
+            EXECUTE format('ALTER TABLE %I DROP CONSTRAINT IF EXISTS %I', t, t || '_patient_id_fkey');
+            EXECUTE format(
+                'ALTER TABLE %I ADD CONSTRAINT %I FOREIGN KEY (patient_id) REFERENCES patients(id) ON DELETE CASCADE',
+                t, t || '_patient_id_fkey'
+            );
+        END IF;
+    END LOOP;
+END $$;
+
+-- Verify
+SELECT tc.table_name, rc.delete_rule
+FROM information_schema.referential_constraints rc
+JOIN information_schema.table_constraints tc ON tc.constraint_name = rc.constraint_name
+WHERE rc.constraint_name LIKE '%_patient_id_fkey';
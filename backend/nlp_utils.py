@@ -1,6 +1,19 @@
 import os
+import hashlib
+import threading
+from collections import OrderedDict
 import spacy
-from typing import Dict, Any
+from spacy.tokens import Doc
+from typing import Dict, Any, Iterable, List
+
+# Importing negspacy registers the "negex" pipeline factory with spaCy. It must
+# happen here, not only in the agents that read ent._.negex, or whichever caller
+# loads the shared pipeline first decides whether it ever gets NegEx.
+try:
+    from negspacy.negation import Negex  # noqa: F401
+    NEGSPACY_AVAILABLE = True
+except ImportError:
+    NEGSPACY_AVAILABLE = False
 
 # spaCy NLP runs on CPU (fast enough for our entity extraction workload).
 # Ollama LLM runs on GPU (handles the heavy inference).
@@ -8,7 +21,15 @@ from typing import Dict, Any
 # cuda_fp16.h compilation errors, so we explicitly stay on CPU.
 
 _shared_nlp = {}
+_nlp_lock = threading.Lock()
 _shared_llm = None
+_shared_json_llm = None
+
+# Components never consumed downstream: callers only read doc.ents, negex/kb_ents
+# extensions and doc.sents. NER, NegEx and the UMLS linker don't depend on the
+# tagger/parser/lemmatizer, and sentences come from the sentencizer added below.
+# Excluding (rather than disabling) also skips loading their weights.
+_EXCLUDED_PIPES = ["tagger", "parser", "attribute_ruler", "lemmatizer"]
 
 def get_nlp(model_name: str = "en_core_sci_lg", load_linker: bool = False):
     """Get or load a shared spaCy model with medical pipelines."""
@@ -20,73 +41,193 @@ def get_nlp(model_name: str = "en_core_sci_lg", load_linker: bool = False):
     if model_name == "en_core_sci_sm" and f"en_core_sci_lg_{'linker' if load_linker else 'basic'}" in _shared_nlp:
          return _shared_nlp[f"en_core_sci_lg_{'linker' if load_linker else 'basic'}"]
             
-    if cache_key not in _shared_nlp:
-        print(f"⏳ Loading shared NLP model: {model_name} (Linker: {load_linker})...")
-        try:
-            disable_pipes = ["parser", "attribute_ruler", "lemmatizer"]
-            nlp = spacy.load(model_name, disable=disable_pipes)
-            print(f"✅ Loaded NLP model: {model_name}")
-        except Exception as e:
-            print(f"⚠️  Failed to load {model_name}: {e}")
-            fallback = "en_core_sci_sm" if "lg" in model_name else "en_core_web_sm"
-            if f"{fallback}_{'linker' if load_linker else 'basic'}" in _shared_nlp:
-                return _shared_nlp[f"{fallback}_{'linker' if load_linker else 'basic'}"]
-            print(f"🔄 Retrying with fallback: {fallback}")
+    nlp = _shared_nlp.get(cache_key)
+    if nlp is not None:
+        return nlp
+
+    # Double-checked: concurrent first requests must not each run spacy.load
+    # (gigabytes of RAM per copy), so loading is serialized and re-checked
+    with _nlp_lock:
+        if cache_key not in _shared_nlp:
+            print(f"⏳ Loading shared NLP model: {model_name} (Linker: {load_linker})...")
             try:
-                nlp = spacy.load(fallback, disable=["parser", "attribute_ruler", "lemmatizer"])
-                if "sentencizer" not in nlp.pipe_names:
-                    nlp.add_pipe("sentencizer")
-                model_name = fallback
-                print(f"✅ Loaded fallback NLP model: {model_name}")
-            except Exception:
-                nlp = spacy.load("en_core_web_sm", disable=["parser", "attribute_ruler", "lemmatizer"])
-                if "sentencizer" not in nlp.pipe_names:
-                    nlp.add_pipe("sentencizer")
-                model_name = "en_core_web_sm"
-                print(f"⚠️  Using basic spaCy")
-
-        if "sentencizer" not in nlp.pipe_names and "parser" not in nlp.pipe_names:
-            nlp.add_pipe("sentencizer")
+                nlp = spacy.load(model_name, exclude=_EXCLUDED_PIPES)
+                print(f"✅ Loaded NLP model: {model_name}")
+            except Exception as e:
+                print(f"⚠️  Failed to load {model_name}: {e}")
+                fallback = "en_core_sci_sm" if "lg" in model_name else "en_core_web_sm"
+                if f"{fallback}_{'linker' if load_linker else 'basic'}" in _shared_nlp:
+                    return _shared_nlp[f"{fallback}_{'linker' if load_linker else 'basic'}"]
+                print(f"🔄 Retrying with fallback: {fallback}")
+                try:
+                    nlp = spacy.load(fallback, exclude=_EXCLUDED_PIPES)
+                    if "sentencizer" not in nlp.pipe_names:
+                        nlp.add_pipe("sentencizer")
+                    model_name = fallback
+                    print(f"✅ Loaded fallback NLP model: {model_name}")
+                except Exception:
+                    nlp = spacy.load("en_core_web_sm", exclude=_EXCLUDED_PIPES)
+                    if "sentencizer" not in nlp.pipe_names:
+                        nlp.add_pipe("sentencizer")
+                    model_name = "en_core_web_sm"
+                    print(f"⚠️  Using basic spaCy")
+
+            if "sentencizer" not in nlp.pipe_names and "parser" not in nlp.pipe_names:
+                nlp.add_pipe("sentencizer")
             
-        if "negex" not in nlp.pipe_names:
-            try:
-                nlp.add_pipe("negex", config={"ent_types": ["ENTITY"]})
-                print(f"✅ NegEx added to {model_name}")
-            except Exception:
-                pass
+            if NEGSPACY_AVAILABLE and "negex" not in nlp.pipe_names:
+                try:
+                    nlp.add_pipe("negex", config={"ent_types": ["ENTITY"]})
+                    print(f"✅ NegEx added to {model_name}")
+                except Exception as e:
+                    print(f"⚠️  Failed to add NegEx to {model_name}: {e}")
                 
-        # ONLY load linker if explicitly requested (saves ~9GB RAM)
-        if load_linker and "sci" in model_name and "scispacy_linker" not in nlp.pipe_names:
-            try:
-                import scispacy
-                from scispacy.linking import EntityLinker
-                print(f"🧬 Loading UMLS Linker for {model_name}...")
-                nlp.add_pipe(
-                    "scispacy_linker",
-                    config={
-                        "linker_name": "umls",
-                        "resolve_abbreviations": True,
-                        "threshold": 0.7
-                    }
-                )
-                print(f"✅ UMLS Linker added to {model_name}")
-            except Exception as e:
-                print(f"⚠️ Failed to add UMLS linker: {e}")
+            # ONLY load linker if explicitly requested (saves ~9GB RAM)
+            if load_linker and "sci" in model_name and "scispacy_linker" not in nlp.pipe_names:
+                try:
+                    import scispacy
+                    from scispacy.linking import EntityLinker
+                    print(f"🧬 Loading UMLS Linker for {model_name}...")
+                    nlp.add_pipe(
+                        "scispacy_linker",
+                        config={
+                            "linker_name": "umls",
+                            "resolve_abbreviations": True,
+                            "threshold": 0.7
+                        }
+                    )
+                    print(f"✅ UMLS Linker added to {model_name}")
+                except Exception as e:
+                    print(f"⚠️ Failed to add UMLS linker: {e}")
         
-        _shared_nlp[cache_key] = nlp
+            _shared_nlp[cache_key] = nlp
         
     return _shared_nlp[cache_key]
 
-def get_llm():
-    """Get a shared Ollama LLM instance. Model is configurable via OLLAMA_MODEL env var."""
-    global _shared_llm
+def batch_parse(texts: Iterable[str], model_name: str = "en_core_sci_lg", load_linker: bool = False,
+                batch_size: int = 128):
+    """Yield Docs for texts via one nlp.pipe stream, so components run per minibatch
+    instead of re-entering the pipeline for every text."""
+    nlp = get_nlp(model_name, load_linker=load_linker)
+    yield from nlp.pipe(texts, batch_size=batch_size, n_process=1)
+
+# Serialized parses of short texts (criteria, stock phrases), which recur across
+# trials. Keyed by pipeline config + disabled pipes + text; values are Doc.to_bytes().
+_PARSE_CACHE_SIZE = int(os.getenv("NLP_PARSE_CACHE_SIZE", "20000"))
+_parse_cache: "OrderedDict[tuple, bytes]" = OrderedDict()
+_parse_cache_lock = threading.Lock()
+
+# Optional on-disk tier (SQLite) so parses survive worker restarts
+_DOC_CACHE_PATH = os.getenv("NLP_DOC_CACHE_PATH")
+_doc_db = None
+
+def _doc_cache_db():
+    """Lazily open the SQLite Doc cache; None when disabled or unavailable. Call under _parse_cache_lock."""
+    global _doc_db, _DOC_CACHE_PATH
+    if _doc_db is None and _DOC_CACHE_PATH:
+        try:
+            import sqlite3
+            path = os.path.expanduser(_DOC_CACHE_PATH)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            db = sqlite3.connect(path, check_same_thread=False)
+            db.execute("PRAGMA journal_mode=WAL")
+            db.execute("CREATE TABLE IF NOT EXISTS docs (key BLOB PRIMARY KEY, data BLOB NOT NULL)")
+            _doc_db = db
+        except Exception as e:
+            print(f"⚠️  Could not open spaCy Doc cache at {_DOC_CACHE_PATH}: {e}")
+            _DOC_CACHE_PATH = None
+    return _doc_db
+
+def _doc_cache_key(nlp, prefix: tuple, text: str) -> bytes:
+    # Pipeline version is part of the key so upgraded models don't reuse stale parses
+    meta = f"{nlp.meta.get('name')}|{nlp.meta.get('version')}|{prefix!r}"
+    return hashlib.blake2b(f"{meta}\x00{text}".encode(), digest_size=20).digest()
+
+def pipe_cached(texts: Iterable[str], model_name: str = "en_core_sci_lg", load_linker: bool = False,
+                disable: Iterable[str] = (), batch_size: int = 64) -> List[Doc]:
+    """Parse texts with the shared pipeline, reusing cached Docs for texts seen before
+    (memory LRU, then the optional disk cache). Cache misses go through a single
+    nlp.pipe call. Returned Docs are fresh copies."""
+    texts = list(texts)
+    nlp = get_nlp(model_name, load_linker=load_linker)
+    disable = tuple(disable)
+    prefix = (model_name, load_linker, disable)
+
+    cached = {}
+    with _parse_cache_lock:
+        for text in texts:
+            data = _parse_cache.get(prefix + (text,))
+            if data is not None:
+                _parse_cache.move_to_end(prefix + (text,))
+                cached[text] = data
+    misses = list(dict.fromkeys(t for t in texts if t not in cached))
+
+    disk_keys = {}
+    if misses and _DOC_CACHE_PATH:
+        disk_keys = {t: _doc_cache_key(nlp, prefix, t) for t in misses}
+        by_key = {k: t for t, k in disk_keys.items()}
+        keys = list(by_key)
+        with _parse_cache_lock:
+            db = _doc_cache_db()
+            if db is not None:
+                # Chunked to stay under SQLite's bound-parameter limit
+                for i in range(0, len(keys), 500):
+                    chunk = keys[i:i + 500]
+                    rows = db.execute(
+                        f"SELECT key, data FROM docs WHERE key IN ({','.join('?' * len(chunk))})", chunk
+                    ).fetchall()
+                    for key, data in rows:
+                        text = by_key[key]
+                        cached[text] = _parse_cache[prefix + (text,)] = data
+        misses = [t for t in misses if t not in cached]
+
+    if misses:
+        parsed = {t: doc.to_bytes() for t, doc in
+                  zip(misses, nlp.pipe(misses, batch_size=batch_size, disable=list(disable)))}
+        cached.update(parsed)
+        with _parse_cache_lock:
+            for text, data in parsed.items():
+                _parse_cache[prefix + (text,)] = data
+            db = _doc_cache_db() if disk_keys else None
+            if db is not None:
+                db.executemany("INSERT OR REPLACE INTO docs (key, data) VALUES (?, ?)",
+                               [(disk_keys[t], data) for t, data in parsed.items()])
+                db.commit()
+
+    with _parse_cache_lock:
+        while len(_parse_cache) > _PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+
+    return [Doc(nlp.vocab).from_bytes(cached[t]) for t in texts]
+
+def parse_cached(text: str, model_name: str = "en_core_sci_lg", load_linker: bool = False,
+                 disable: Iterable[str] = ()) -> Doc:
+    """Single-text pipe_cached."""
+    return pipe_cached([text], model_name, load_linker=load_linker, disable=disable)[0]
+
+def get_llm(json_mode: bool = False):
+    """Get a shared Ollama LLM instance. Model is configurable via OLLAMA_MODEL env var.
+
+    json_mode=True returns a separate shared instance with Ollama's format="json",
+    which constrains decoding to valid JSON (for extraction prompts, not chat).
+    """
+    global _shared_llm, _shared_json_llm
+    if json_mode:
+        if _shared_json_llm is None:
+            _shared_json_llm = _create_llm(format="json")
+        return _shared_json_llm
     if _shared_llm is None:
-        from langchain_ollama import OllamaLLM
-        model_name = os.getenv("OLLAMA_MODEL", "llama3.1")
-        _shared_llm = OllamaLLM(
-            model=model_name,
-            temperature=0,
-            base_url=os.getenv("OLLAMA_URL", "http://localhost:11434")
-        )
-        print(f"✅ Shared LLM initialized: {model_name}")
+        _shared_llm = _create_llm()
     return _shared_llm
+
+def _create_llm(**kwargs):
+    from langchain_ollama import OllamaLLM
+    model_name = os.getenv("OLLAMA_MODEL", "llama3.1")
+    llm = OllamaLLM(
+        model=model_name,
+        temperature=0,
+        base_url=os.getenv("OLLAMA_URL", "http://localhost:11434"),
+        **kwargs
+    )
+    print(f"✅ Shared LLM initialized: {model_name}{' (JSON mode)' if kwargs.get('format') == 'json' else ''}")
+    return llm
@@ -1,12 +1,27 @@
 from fastapi import APIRouter, Depends, HTTPException
+from fastapi.responses import ORJSONResponse
 from sqlalchemy.orm import Session
 from typing import List, Optional
-from backend.db_models import get_session, AuditLog
+from sqlalchemy import select, func
+from backend.db_models import db_session, AuditLog
+from backend.utils.auditor import Auditor
 from pydantic import BaseModel
 from datetime import datetime
 
 router = APIRouter(prefix="/api/audit", tags=["Audit Trail"])
 
+# Rows fetched per round trip while re-hashing the chain in verify_integrity
+VERIFY_BATCH_SIZE = 1000
+
+# Columns served by /logs, in AuditLogResponse order
+_LOG_COLUMNS = (AuditLog.id, AuditLog.timestamp, AuditLog.action, AuditLog.target_type,
+                AuditLog.target_id, AuditLog.agent, AuditLog.status, AuditLog.details,
+                AuditLog.document_hash, AuditLog.previous_hash, AuditLog.entry_hash)
+
+# Columns Auditor.log hashes into entry_hash (besides previous_hash), for recompute mode
+_HASHED_COLUMNS = (AuditLog.timestamp, AuditLog.action, AuditLog.agent, AuditLog.target_type,
+                   AuditLog.target_id, AuditLog.status, AuditLog.details, AuditLog.document_hash)
+
 class AuditLogResponse(BaseModel):
     id: int
     timestamp: datetime
@@ -24,37 +39,68 @@ class AuditLogResponse(BaseModel):
         from_attributes = True
 
 @router.get("/logs", response_model=List[AuditLogResponse])
-async def get_audit_logs(limit: int = 100, offset: int = 0):
-    """Get audit logs for compliance review"""
-    session = get_session()
-    try:
-        logs = session.query(AuditLog).order_by(AuditLog.id.desc()).offset(offset).limit(limit).all()
-        return logs
-    finally:
-        session.close()
+def get_audit_logs(limit: int = 100, offset: int = 0, before_id: Optional[int] = None,
+                   session: Session = Depends(db_session)):
+    """Get audit logs for compliance review, newest first.
+
+    Page with before_id (the id of the last log received): it seeks straight into
+    the primary key index, whereas offset still scans and discards every skipped row.
+    Rows go straight to orjson; AuditLogResponse only documents the shape.
+    """
+    stmt = select(*_LOG_COLUMNS).order_by(AuditLog.id.desc())
+    if before_id is not None:
+        stmt = stmt.where(AuditLog.id < before_id)
+    elif offset:
+        stmt = stmt.offset(offset)
+    rows = session.execute(stmt.limit(limit)).mappings().all()
+    return ORJSONResponse([dict(row) for row in rows])
 
 @router.get("/verify-integrity")
-async def verify_integrity():
-    """Verify the cryptographic chain of the audit trail"""
-    session = get_session()
-    try:
-        logs = session.query(AuditLog).order_by(AuditLog.id.asc()).all()
-        
-        if not logs:
-            return {"status": "verified", "message": "No logs to verify"}
-        
-        # Simple chain verification
-        integrity_errors = []
-        expected_previous_hash = "0" * 64
-        
-        for log in logs:
-            if log.previous_hash != expected_previous_hash:
-                integrity_errors.append(f"Broken chain at ID {log.id}: Expected previous hash {expected_previous_hash}, but found {log.previous_hash}")
-            expected_previous_hash = log.entry_hash
-            
-        if integrity_errors:
-            return {"status": "failed", "errors": integrity_errors}
+def verify_integrity(recompute: bool = False, session: Session = Depends(db_session)):
+    """Verify the cryptographic chain of the audit trail.
+
+    With recompute=true each entry's hash is also re-derived from its stored
+    contents, so edits to a row (not just broken links) are detected.
+    """
+    # Link check runs in PostgreSQL: LAG pairs each row with its predecessor's
+    # entry_hash in one ordered scan, and only broken links come back
+    genesis = "0" * 64
+    chain = select(
+        AuditLog.id,
+        AuditLog.previous_hash,
+        func.lag(AuditLog.entry_hash, 1, genesis).over(order_by=AuditLog.id).label("expected"),
+    ).subquery()
+    broken = session.execute(
+        select(chain.c.id, chain.c.previous_hash, chain.c.expected)
+        .where(chain.c.previous_hash.is_distinct_from(chain.c.expected))
+        .order_by(chain.c.id)
+    )
+    integrity_errors = [
+        f"Broken chain at ID {log_id}: Expected previous hash {expected}, but found {previous_hash}"
+        for log_id, previous_hash, expected in broken
+    ]
+
+    if recompute:
+        # Re-hashing needs each row's contents in Python; stream them in batches
+        rows = session.execute(
+            select(AuditLog.id, AuditLog.previous_hash, AuditLog.entry_hash, *_HASHED_COLUMNS)
+            .order_by(AuditLog.id.asc())
+            .execution_options(yield_per=VERIFY_BATCH_SIZE)
+        )
+        verified = 0
+        for row in rows:
+            content = {column.key: getattr(row, column.key) for column in _HASHED_COLUMNS}
+            content["previous_hash"] = row.previous_hash
+            if Auditor._calculate_hash(content) != row.entry_hash:
+                integrity_errors.append(f"Tampered entry at ID {row.id}: stored hash does not match its contents")
+            verified += 1
+    else:
+        verified = session.execute(select(func.count()).select_from(AuditLog)).scalar()
+    
+    if not verified:
+        return {"status": "verified", "message": "No logs to verify"}
         
-        return {"status": "verified", "message": f"Successfully verified chain of {len(logs)} records"}
-    finally:
-        session.close()
+    if integrity_errors:
+        return {"status": "failed", "errors": integrity_errors}
+    
+    return {"status": "verified", "message": f"Successfully verified chain of {verified} records"}
@@ -1,19 +1,38 @@
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
 from pydantic import BaseModel
-from typing import Optional
+from typing import Optional, Tuple
+from collections import OrderedDict
+import os
+import time
+import hashlib
+import threading
 from backend.agents.chat_agent import TrialChatAgent
 
 router = APIRouter(prefix="/api/chat", tags=["chat"])
 
-# Singleton agent
+# Singleton agent (pre-warmed at startup)
 _chat_agent = None
+_chat_agent_lock = threading.Lock()
 
 def get_chat_agent():
     global _chat_agent
     if _chat_agent is None:
-        _chat_agent = TrialChatAgent()
+        # Double-checked: concurrent cold requests must build only one agent
+        with _chat_agent_lock:
+            if _chat_agent is None:
+                _chat_agent = TrialChatAgent()
     return _chat_agent
 
+# Answers to repeated (trial, question) pairs are reused for CHAT_CACHE_TTL seconds
+# (0 disables); the TTL bounds how stale an answer can get as trial analyses change
+CHAT_CACHE_TTL = int(os.getenv("CHAT_CACHE_TTL", "3600"))
+CHAT_CACHE_SIZE = 1024
+_chat_cache: "OrderedDict[bytes, Tuple[float, str]]" = OrderedDict()
+_chat_cache_lock = threading.Lock()
+
+def _chat_cache_key(query: str, trial_id: Optional[str]) -> bytes:
+    return hashlib.blake2b(f"{trial_id or ''}\x00{query.strip()}".encode(), digest_size=16).digest()
+
 class ChatRequest(BaseModel):
     query: str
     trial_id: Optional[str] = None
@@ -22,9 +41,26 @@ class ChatResponse(BaseModel):
     response: str
 
 @router.post("/", response_model=ChatResponse)
-async def chat_endpoint(request: ChatRequest, agent: TrialChatAgent = Depends(get_chat_agent)):
+def chat_endpoint(request: ChatRequest, response: Response,
+                  agent: TrialChatAgent = Depends(get_chat_agent)):
     """
     Chat with the specialized Trial Agent.
+    Plain def: the LLM round trip blocks, so FastAPI runs it in the threadpool.
     """
-    response = agent.chat(request.query, request.trial_id)
-    return {"response": response}
+    key = _chat_cache_key(request.query, request.trial_id)
+    with _chat_cache_lock:
+        entry = _chat_cache.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            _chat_cache.move_to_end(key)
+            response.headers["X-Cache"] = "HIT"
+            return {"response": entry[1]}
+
+    answer = agent.chat(request.query, request.trial_id)
+    if CHAT_CACHE_TTL > 0 and answer != TrialChatAgent.ERROR_RESPONSE:
+        with _chat_cache_lock:
+            _chat_cache[key] = (time.monotonic() + CHAT_CACHE_TTL, answer)
+            _chat_cache.move_to_end(key)
+            while len(_chat_cache) > CHAT_CACHE_SIZE:
+                _chat_cache.popitem(last=False)
+    response.headers["X-Cache"] = "MISS"
+    return {"response": answer}
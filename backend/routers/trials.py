@@ -5,7 +5,7 @@ import shutil
 import uuid
 import logging
 from typing import List, Dict
-from backend.db_models import get_session, Patient, ClinicalTrial, EligibilityCriteria
+from backend.db_models import get_session, Patient, ClinicalTrial, EligibilityCriteria, bulk_insert_criteria
 from backend.agents.protocol_rule_agent import ProtocolRuleAgent
 from backend.agents.fda_processor import FDAProcessor
 import json
@@ -404,7 +404,7 @@ async def upload_protocol(file: UploadFile = File(...), background_tasks: Backgr
                 pass
 
             # Save criteria with enhanced structured data
-            criteria_count = 0
+            criteria_rows = []
             for c_type in ['inclusion', 'exclusion']:
                 for c_data in criteria.get(c_type, []):
                     text_to_save = c_data.get('source_text') or c_data.get('text', '')
@@ -438,7 +438,7 @@ async def upload_protocol(file: UploadFile = File(...), background_tasks: Backgr
                     # Remove None values
                     structured_data = {k: v for k, v in structured_data.items() if v is not None}
                     
-                    criterion = EligibilityCriteria(
+                    criteria_rows.append(dict(
                         trial_id=new_trial.id,
                         criterion_type=c_type,
                         text=text_to_save,
@@ -454,10 +454,10 @@ async def upload_protocol(file: UploadFile = File(...), background_tasks: Backgr
                         temporal_window_months=c_data.get('temporal', {}).get('window') if isinstance(c_data.get('temporal'), dict) else None,
                         scope=c_data.get('scope', 'personal'),
                         value_list=c_data.get('value_list')
-                    )
-                    db.add(criterion)
-                    criteria_count += 1
+                    ))
             
+            # One COPY for all criteria instead of an INSERT per row
+            criteria_count = bulk_insert_criteria(db, criteria_rows)
             db.commit()
             print(f"✅ Saved {criteria_count} criteria to database")
 
@@ -650,13 +650,13 @@ def _bg_extract_criteria(trial_id: str, trial_db_id: int, document_id: int):
 
     db2 = get_session()
     try:
-        criteria_count = 0
+        criteria_rows = []
         for c_type in ['inclusion', 'exclusion']:
             for c_data in criteria.get(c_type, []):
                 text_to_save = c_data.get('source_text') or c_data.get('text', '')
                 if not text_to_save or len(text_to_save.strip()) < 5:
                     continue
-                db2.add(EligibilityCriteria(
+                criteria_rows.append(dict(
                     trial_id=trial_db_id, criterion_type=c_type,
                     text=text_to_save,
                     category=c_data.get('rule_type', 'unclassified'),
@@ -665,7 +665,7 @@ def _bg_extract_criteria(trial_id: str, trial_db_id: int, document_id: int):
                     unit=c_data.get('unit'), negated=c_data.get('negated', False),
                     structured_data=c_data,
                 ))
-                criteria_count += 1
+        criteria_count = bulk_insert_criteria(db2, criteria_rows)
         db2.commit()
 
         trial = db2.query(ClinicalTrial).filter_by(trial_id=trial_id).first()
@@ -789,7 +789,7 @@ def _bg_run_analysis(trial_id: str, trial_db_id: int):
     try:
         from backend.events import event_bus
         trial_data["full_text"] = full_text
-        event_bus.publish("TRIAL_CREATED", trial_data)
+        event_bus.publish_threadsafe("TRIAL_CREATED", trial_data)
 
         _analysis_status[trial_id] = {"status": "running", "progress": 50,
                                        "message": "LTAA + InSilico running in background..."}
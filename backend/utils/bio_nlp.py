@@ -18,39 +18,47 @@ def extract_bio_entities(text: str) -> List[Dict[str, Any]]:
     Extract biological entities (Proteins, Genes, Diseases, Chemicals) from text.
     Uses the shared NLP model with UMLS EntityLinker.
     """
+    return extract_bio_entities_batch([text])[0]
+
+
+def extract_bio_entities_batch(texts: List[str], batch_size: int = 16) -> List[List[Dict[str, Any]]]:
+    """extract_bio_entities for many texts, parsed in one nlp.pipe stream."""
     try:
+        from backend.nlp_utils import batch_parse
         nlp = get_nlp()
-        doc = nlp(text)
 
         has_linker = "scispacy_linker" in nlp.pipe_names
         linker = nlp.get_pipe("scispacy_linker") if has_linker else None
-        
-        entities = []
-        for ent in doc.ents:
-            entity_info = {
-                "text": ent.text,
-                "label": ent.label_,
-                "start": ent.start_char,
-                "end": ent.end_char,
-                "umls_id": None,
-                "canonical_name": None
-            }
-            
-            if has_linker and ent._.kb_ents:
-                best_match_id, score = ent._.kb_ents[0]
-                kb_entry = linker.kb.cui_to_entity[best_match_id]
-                entity_info["umls_id"] = best_match_id
-                entity_info["canonical_name"] = kb_entry.canonical_name
-                entity_info["types"] = kb_entry.types
-            else:
-                entity_info["types"] = []
+
+        results = []
+        for doc in batch_parse(texts, "en_core_sci_lg", load_linker=True, batch_size=batch_size):
+            entities = []
+            for ent in doc.ents:
+                entity_info = {
+                    "text": ent.text,
+                    "label": ent.label_,
+                    "start": ent.start_char,
+                    "end": ent.end_char,
+                    "umls_id": None,
+                    "canonical_name": None
+                }
                 
-            entities.append(entity_info)
+                if has_linker and ent._.kb_ents:
+                    best_match_id, score = ent._.kb_ents[0]
+                    kb_entry = linker.kb.cui_to_entity[best_match_id]
+                    entity_info["umls_id"] = best_match_id
+                    entity_info["canonical_name"] = kb_entry.canonical_name
+                    entity_info["types"] = kb_entry.types
+                else:
+                    entity_info["types"] = []
+                    
+                entities.append(entity_info)
+            results.append(entities)
             
-        return entities
+        return results
     except Exception as e:
         logger.error(f"Error extracting bio entities: {str(e)}")
-        return []
+        return [[] for _ in texts]
 
 def filter_entities_by_type(entities: List[Dict[str, Any]], target_labels: List[str] = None) -> List[Dict[str, Any]]:
     """
@@ -0,0 +1,109 @@
+"""
+Response cache for LLM criterion normalization.
+
+Keyed by sha256 of (prompt version, category, rule type, source text). Entries live
+in an in-memory LRU with a TTL and, when LLM_NORM_CACHE_PATH is set, are also
+persisted to a shelve file so they survive restarts.
+"""
+
+import os
+import json
+import time
+import shelve
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+# Bump when the normalization prompt changes so stale answers aren't reused
+PROMPT_VERSION = "v1"
+
+DEFAULT_TTL_SECONDS = 7 * 24 * 3600
+
+
+class LLMCache:
+    """Exact-match cache of normalized rules, with hit/miss stats."""
+
+    def __init__(self, maxsize: int = 10_000, ttl: int = DEFAULT_TTL_SECONDS):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stats = {"hits": 0, "misses": 0}
+        self._lock = threading.Lock()
+        self._memory: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._shelf = self._open_shelf()
+
+    @staticmethod
+    def make_key(source_text: str, category: str = None, rule_type: str = None) -> str:
+        payload = {
+            "prompt_version": PROMPT_VERSION,
+            "category": category,
+            "rule_type": rule_type,
+            "text": source_text,
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def get(self, key: str) -> Optional[Dict]:
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, rule = entry
+                if expires >= time.time():
+                    self._memory.move_to_end(key)
+                    self.stats["hits"] += 1
+                    return rule
+                del self._memory[key]
+
+            rule = self._get_persistent(key)
+            if rule is not None:
+                self._remember(key, rule)
+                self.stats["hits"] += 1
+            else:
+                self.stats["misses"] += 1
+            return rule
+
+    def set(self, key: str, rule: Dict, ttl: Optional[int] = None):
+        ttl = self.ttl if ttl is None else ttl
+        with self._lock:
+            self._remember(key, rule, ttl)
+            self._set_persistent(key, rule, ttl)
+
+    def _remember(self, key: str, rule: Dict, ttl: Optional[int] = None):
+        self._memory[key] = (time.time() + (self.ttl if ttl is None else ttl), rule)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.maxsize:
+            self._memory.popitem(last=False)
+
+    # ------------------------------------------------------ persistent tier
+    # Called under self._lock: shelve is not safe for concurrent access
+
+    @staticmethod
+    def _open_shelf():
+        path = os.getenv("LLM_NORM_CACHE_PATH")
+        if not path:
+            return None
+        try:
+            path = os.path.expanduser(path)
+            os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+            return shelve.open(path)
+        except Exception as e:
+            print(f"⚠️  Could not open LLM normalization cache at {path}: {e}")
+            return None
+
+    def _get_persistent(self, key: str) -> Optional[Dict]:
+        if self._shelf is None:
+            return None
+        try:
+            entry = self._shelf.get(key)
+            if entry and entry[0] >= time.time():
+                return entry[1]
+        except Exception as e:
+            print(f"⚠️  LLM cache read failed: {e}")
+        return None
+
+    def _set_persistent(self, key: str, rule: Dict, ttl: int):
+        if self._shelf is None:
+            return
+        try:
+            self._shelf[key] = (time.time() + ttl, rule)
+        except Exception as e:
+            print(f"⚠️  LLM cache write failed: {e}")
@@ -51,9 +51,11 @@ const TrialAnalysisSidebar = ({ open, onClose, patient, trial, analysis }) => {
     });
 
     const getAge = (birthdate) => {
+        // null from /api/patients/{id}; older saved analyses may hold the string "None"
         if (!birthdate) return 'Unknown';
-        const today = new Date();
         const birthDate = new Date(birthdate);
+        if (isNaN(birthDate.getTime())) return 'Unknown';
+        const today = new Date();
         let age = today.getFullYear() - birthDate.getFullYear();
         const m = today.getMonth() - birthDate.getMonth();
         if (m < 0 || (m === 0 && today.getDate() < birthDate.getDate())) {
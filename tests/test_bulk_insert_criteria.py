@@ -0,0 +1,53 @@
+"""bulk_insert_criteria must keep '' and NULL distinct through COPY CSV.
+
+The round-trip test needs a PostgreSQL database: set TEST_DATABASE_URL to run it
+(everything it writes is rolled back).
+"""
+
+import csv
+import io
+import os
+import uuid
+
+import pytest
+
+pytest.importorskip("sqlalchemy")
+pytest.importorskip("orjson")
+
+from backend.db_models import (  # noqa: E402
+    _CRITERIA_COPY_COLUMNS, _criteria_copy_line, bulk_insert_criteria,
+)
+
+
+def test_copy_line_quotes_empty_strings_and_leaves_null_unquoted():
+    line = _criteria_copy_line({"trial_id": 1, "criterion_id": "", "text": 'a "b", c', "unit": None})
+    fields = line.rstrip("\n").split(",", 2)
+
+    assert fields[0] == "1"
+    assert fields[1] == '""'  # empty string -> quoted, loads as ''
+    assert next(csv.reader(io.StringIO(line)))[_CRITERIA_COPY_COLUMNS.index("text")] == 'a "b", c'
+    assert ",," in line  # None -> unquoted empty field, loads as NULL
+
+
+@pytest.mark.skipif(not os.getenv("TEST_DATABASE_URL"), reason="TEST_DATABASE_URL not set")
+def test_empty_string_round_trips_through_copy():
+    from sqlalchemy import create_engine, select
+    from sqlalchemy.orm import Session
+    from backend.db_models import Base, ClinicalTrial, EligibilityCriteria
+
+    engine = create_engine(os.environ["TEST_DATABASE_URL"])
+    Base.metadata.create_all(engine)
+    with Session(engine) as session:
+        trial = ClinicalTrial(trial_id=f"TEST_{uuid.uuid4().hex[:8]}")
+        session.add(trial)
+        session.flush()
+
+        bulk_insert_criteria(session, [{"trial_id": trial.id, "criterion_id": "", "text": "Age >= 18", "unit": None}])
+        row = session.execute(
+            select(EligibilityCriteria.criterion_id, EligibilityCriteria.unit)
+            .where(EligibilityCriteria.trial_id == trial.id)
+        ).one()
+
+        assert row.criterion_id == ""
+        assert row.unit is None
+        session.rollback()